@@ -0,0 +1,69 @@
+import re
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def _ffmpeg_binary() -> str:
+    """Путь к ffmpeg: системный или из imageio-ffmpeg (ставится вместе с moviepy)"""
+    path = shutil.which("ffmpeg")
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        raise RuntimeError("ffmpeg не найден. Установите ffmpeg и добавьте его в PATH")
+
+
+def load_audio(media_path: Path, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Декодирует только аудиодорожку контейнера в моно float32 с частотой sr.
+
+    Видеопоток не декодируется (-vn), результат не пишется на диск:
+    ffmpeg отдаёт PCM s16le в stdout, который сразу превращается в массив NumPy.
+    """
+    cmd = [
+        _ffmpeg_binary(),
+        "-nostdin",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-threads", "0",
+        "-i", str(media_path),
+        "-map", "0:a:0",
+        "-vn", "-sn", "-dn",
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "-ac", "1",
+        "-ar", str(sr),
+        "-",
+    ]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        message = proc.stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"Не удалось декодировать аудио: {message}")
+    pcm = np.frombuffer(proc.stdout, dtype=np.int16)
+    if pcm.size == 0:
+        raise RuntimeError(f"В файле нет аудиодорожки: {Path(media_path).name}")
+    return pcm.astype(np.float32) / 32768.0
+
+
+def media_duration(media_path: Path) -> Optional[float]:
+    """Длительность файла в секундах по заголовку контейнера, без декодирования; None, если не удалось"""
+    try:
+        proc = subprocess.run([_ffmpeg_binary(), "-nostdin", "-hide_banner", "-i", str(media_path)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=30)
+    except (RuntimeError, OSError, subprocess.TimeoutExpired):
+        return None
+    # Без выходного файла ffmpeg завершается с ошибкой, но заголовок уже напечатан в stderr
+    match = _DURATION_RE.search(proc.stderr.decode("utf-8", errors="replace"))
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
@@ -0,0 +1,53 @@
+import os
+from pathlib import Path
+
+import numpy as np
+
+from .audio import load_audio
+from .disk_cache import SizeBoundedCache
+
+
+class AudioCache(SizeBoundedCache):
+    """Декодированное аудио (16 кГц, моно, float32) в файлах <хэш медиа>.npy.
+
+    Файл декодируется один раз, дальше его читают через np.load(mmap_mode='r') без копирования:
+    повторные запуски с другой моделью или языком, VAD, определение языка и процессы
+    параллельной транскрибации берут отсчёты прямо из отображённого в память файла.
+    """
+
+    pattern = "*.npy"
+
+    def __init__(self, cache_dir: Path, max_mb: float = 4096):
+        super().__init__(cache_dir, max_mb)
+
+    def path_for(self, fingerprint: str) -> Path:
+        return self.cache_dir / f"{fingerprint}.npy"
+
+    def load(self, media_path: Path, fingerprint: str) -> np.ndarray:
+        """Отображённое в память аудио из кэша; если записать кэш не удалось — массив в памяти"""
+        path = self.path_for(fingerprint)
+        with self._lock:
+            try:
+                audio = np.load(path, mmap_mode='r')
+            except FileNotFoundError:
+                pass
+            else:
+                self._touch(path)
+                return audio
+        audio = load_audio(media_path)
+        tmp_path = path.with_name(f"{fingerprint}.tmp.npy")
+        with self._lock:
+            try:
+                np.save(tmp_path, audio, allow_pickle=False)
+                os.replace(tmp_path, path)
+                # mmap открывается до вытеснения: удаление файла другим слотом ему уже не мешает
+                cached = np.load(path, mmap_mode='r')
+            except OSError:
+                # Нет места или папка недоступна — работаем без кэша
+                try:
+                    tmp_path.unlink()
+                except OSError:
+                    pass
+                return audio
+            self._evict(keep=path)
+        return cached
@@ -0,0 +1,68 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Окно в сэмплах аудио, по которому транскрибируется запись: (начало, конец)
+Span = Tuple[int, int]
+
+
+class TranscriptionCheckpoint:
+    """Журнал готовых окон транскрибации в формате JSON Lines.
+
+    Первая строка — заголовок с параметрами, при которых окна были нарезаны; каждая
+    следующая — одно завершённое окно с его сегментами. Строка дописывается и сбрасывается
+    на диск (fsync) сразу после окна, поэтому после падения теряется максимум одно окно.
+    Недописанная последняя строка при чтении игнорируется.
+    """
+
+    def __init__(self, path: Path, header: dict):
+        self.path = Path(path)
+        self.header = header
+
+    def load(self) -> Dict[Span, List[dict]]:
+        if not self.path.exists():
+            return {}
+        completed: Dict[Span, List[dict]] = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        try:
+            header = json.loads(lines[0]) if lines else None
+        except json.JSONDecodeError:
+            header = None
+        if header != self.header:
+            # Нарезка окон не совпадает с текущими параметрами — начинаем заново
+            self.remove()
+            return {}
+        valid = [lines[0]]
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Запись оборвалась при падении: отрезаем хвост, чтобы следующие окна дописывались чисто
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    f.writelines(valid)
+                break
+            valid.append(line)
+            completed[(record["start"], record["end"])] = record["segments"]
+        return completed
+
+    def commit(self, start: int, end: int, segments: List[dict]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not self.path.exists()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            if is_new:
+                f.write(json.dumps(self.header, ensure_ascii=False) + "\n")
+            f.write(json.dumps({"start": start, "end": end, "segments": segments}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def remove(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def committed_seconds(completed: Dict[Span, List[dict]], sr: int) -> float:
+        return sum(end - start for start, end in completed) / sr
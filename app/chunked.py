@@ -0,0 +1,169 @@
+import multiprocessing
+import os
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .audio import SAMPLE_RATE
+
+# Модель Whisper, загруженная в процессе пула (у каждого процесса своя)
+_process_model = None
+_process_device = "cpu"
+
+
+def default_process_count() -> int:
+    """Половина логических ядер: каждый процесс сам использует несколько потоков torch"""
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def find_cut_points(audio: np.ndarray, window_sec: float, sr: int = SAMPLE_RATE,
+                    search_sec: float = 30.0, frame_ms: int = 100) -> List[int]:
+    """Точки разреза (в сэмплах) примерно через window_sec, в самом тихом месте перед границей окна"""
+    frame = int(sr * frame_ms / 1000)
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return []
+    rms = np.sqrt(np.mean(audio[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+
+    window_frames = max(1, int(window_sec * sr / frame))
+    search_frames = max(1, min(int(search_sec * sr / frame), window_frames // 4))
+    cuts = []
+    position = 0
+    while position + window_frames < n_frames:
+        target = position + window_frames
+        lo = max(position + 1, target - search_frames)
+        quietest = lo + int(np.argmin(rms[lo:target + 1]))
+        cuts.append(quietest * frame)
+        position = quietest
+    return cuts
+
+
+def plan_windows(audio: np.ndarray, window_sec: float, overlap_sec: float,
+                 sr: int = SAMPLE_RATE) -> List[Tuple[int, int, int, int]]:
+    """Окна (начало, конец, начало зоны ответственности, конец зоны ответственности) в сэмплах.
+
+    Окна режутся по паузам и перекрываются на overlap_sec с каждой стороны разреза,
+    чтобы Whisper видел контекст. Зоны ответственности не пересекаются и покрывают всю запись.
+    """
+    cuts = find_cut_points(audio, window_sec, sr)
+    bounds = [0] + cuts + [len(audio)]
+    overlap = int(overlap_sec * sr)
+    windows = []
+    for own_start, own_end in zip(bounds[:-1], bounds[1:]):
+        windows.append((max(0, own_start - overlap), min(len(audio), own_end + overlap), own_start, own_end))
+    return windows
+
+
+def own_segments(own_start: float, own_end: float, segments: List[dict]) -> List[dict]:
+    """Сегменты окна, середина которых попадает в его зону ответственности"""
+    return [seg for seg in segments if own_start <= (seg['start'] + seg['end']) / 2 < own_end]
+
+
+def stitch_segments(window_results: List[Tuple[float, float, List[dict]]]) -> List[dict]:
+    """Склеивает сегменты окон, убирая дубли из зон перекрытия.
+
+    Сегмент остаётся только в том окне, в зону ответственности которого попадает его середина.
+    """
+    stitched = []
+    for own_start, own_end, segments in sorted(window_results, key=lambda r: r[0]):
+        stitched.extend(own_segments(own_start, own_end, segments))
+    stitched.sort(key=lambda s: s['start'])
+    for i, seg in enumerate(stitched):
+        seg['id'] = i
+    return stitched
+
+
+def _init_process(model_size: str, device: str, torch_threads: int):
+    global _process_model, _process_device
+    import torch
+    import whisper
+    torch.set_num_threads(max(1, torch_threads))
+    _process_device = device
+    _process_model = whisper.load_model(model_size, device=device)
+
+
+def _transcribe_window(source, start: int, end: int, offset_sec: float, language: Optional[str]) -> List[dict]:
+    # source — путь к .npy из кэша аудио (читается через mmap без копирования) или сам фрагмент
+    if isinstance(source, str):
+        audio = np.load(source, mmap_mode='r')[start:end]
+    else:
+        audio = source
+    result = _process_model.transcribe(
+        audio,
+        language=language,
+        fp16=_process_device == "cuda",
+        verbose=None
+    )
+    segments = result.get('segments', [])
+    for seg in segments:
+        seg['start'] += offset_sec
+        seg['end'] += offset_sec
+        for word in seg.get('words') or []:
+            word['start'] += offset_sec
+            word['end'] += offset_sec
+    return segments
+
+
+def transcribe_parallel(audio: np.ndarray, model_size: str, device: str, language: Optional[str],
+                        window_sec: float, overlap_sec: float, processes: int = 0,
+                        on_window_done: Optional[Callable[[int, int], None]] = None,
+                        completed: Optional[Dict[Tuple[int, int], List[dict]]] = None,
+                        on_window_result: Optional[Callable[[int, int, List[dict]], None]] = None,
+                        audio_path: Optional[Path] = None,
+                        on_ordered: Optional[Callable[[List[dict]], None]] = None) -> List[dict]:
+    """Транскрибирует длинную запись окнами в пуле процессов, в каждом из которых своя модель.
+
+    Если audio_path указывает на .npy с тем же аудио, процессы читают окна из него сами
+    и массив не сериализуется в каждый процесс.
+
+    completed — уже готовые окна по зонам ответственности (из чекпоинта), они не пересчитываются;
+    on_window_result вызывается для каждого нового окна до склейки, чтобы его можно было сохранить.
+    on_ordered получает склеенные сегменты окон строго по порядку записи: окно отдаётся,
+    как только готовы все окна до него, — для частичного SRT.
+    """
+    windows = plan_windows(audio, window_sec, overlap_sec)
+    completed = completed or {}
+    ready = {}
+    next_window = 0
+
+    def add_result(own_start: int, span: Tuple[float, float], segments: List[dict]):
+        nonlocal next_window
+        results.append((*span, segments))
+        ready[own_start] = (span, segments)
+        while on_ordered and next_window < len(windows) and windows[next_window][2] in ready:
+            span, segments = ready.pop(windows[next_window][2])
+            on_ordered(sorted(own_segments(*span, segments), key=lambda s: s['start']))
+            next_window += 1
+
+    results = []
+    todo = []
+    for start, end, own_start, own_end in windows:
+        # Хвост последнего окна забирает всё, даже если Whisper вышел за конец записи
+        span = (own_start / SAMPLE_RATE, own_end / SAMPLE_RATE if own_end < len(audio) else float("inf"))
+        if (own_start, own_end) in completed:
+            add_result(own_start, span, completed[(own_start, own_end)])
+        else:
+            todo.append((start, end, own_start, own_end, span))
+
+    if todo:
+        processes = min(processes or default_process_count(), len(todo))
+        torch_threads = (os.cpu_count() or processes) // processes
+        # spawn: fork из процесса с потоками Qt/torch и загруженной CUDA может зависнуть
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_process, initargs=(model_size, device, torch_threads)) as pool:
+            futures = {}
+            for start, end, own_start, own_end, span in todo:
+                source = str(audio_path) if audio_path else audio[start:end]
+                future = pool.submit(_transcribe_window, source, start, end, start / SAMPLE_RATE, language)
+                futures[future] = (own_start, own_end, span)
+            for done, future in enumerate(as_completed(futures), len(results) + 1):
+                own_start, own_end, span = futures[future]
+                segments = future.result()
+                if on_window_result:
+                    on_window_result(own_start, own_end, segments)
+                add_result(own_start, span, segments)
+                if on_window_done:
+                    on_window_done(done, len(windows))
+    return stitch_segments(results)
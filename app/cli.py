@@ -0,0 +1,310 @@
+"""Консольный запуск транскрибации, OCR и перевода без графического интерфейса.
+
+    python -m app.cli lecture.mp4 videos/ "archive/**/*.mkv" -o out --model small --translate en de
+
+Прогресс и результаты печатаются в stdout строками JSON (по объекту на строку).
+Коды возврата: 0 — все задачи выполнены, 1 — часть задач завершилась ошибкой,
+2 — неверные аргументы или нет входных файлов, 130 — прервано пользователем.
+"""
+import argparse
+import glob
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+
+from PyQt6.QtCore import Qt
+
+from .config import AppConfig
+from .models import TranscriptionTask
+from .scheduler import POLICIES, estimate_cost, sort_key
+
+VIDEO_EXTENSIONS = {".mp4", ".mkv", ".avi", ".mov", ".webm", ".mp3", ".wav", ".m4a", ".flac"}
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+
+class JsonLinesReporter:
+    """Потокобезопасный вывод событий в stdout в формате JSON Lines"""
+
+    def __init__(self, quiet: bool = False, stream=None):
+        self.quiet = quiet
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        if self.quiet and event in ("log", "details"):
+            return
+        record = {"event": event, "time": round(time.time(), 3), **fields}
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+def collect_inputs(items: List[str]) -> List[Path]:
+    """Файлы, папки (рекурсивно) и glob-шаблоны в один список без повторов"""
+    found: List[Path] = []
+    for item in items:
+        path = Path(item)
+        if path.is_dir():
+            candidates = sorted(p for p in path.rglob("*") if p.suffix.lower() in VIDEO_EXTENSIONS)
+        elif path.is_file():
+            candidates = [path]
+        else:
+            candidates = sorted(Path(p) for p in glob.glob(item, recursive=True) if Path(p).is_file())
+        for candidate in candidates:
+            candidate = candidate.resolve()
+            if candidate not in found:
+                found.append(candidate)
+    return found
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="файлы, папки или glob-шаблоны")
+    parser.add_argument("--config", type=Path, default=Path.home() / ".video-transcriber" / "config.json",
+                        help="файл настроек приложения; параметры ниже его переопределяют")
+    parser.add_argument("-o", "--output-dir", type=Path, help="папка для результатов")
+    parser.add_argument("--format", dest="output_format", choices=["srt", "txt"])
+    parser.add_argument("--language", help="язык речи или auto")
+    parser.add_argument("--model", dest="model_size", choices=["tiny", "base", "small", "medium", "large"])
+    parser.add_argument("--device", choices=["cpu", "cuda"])
+    parser.add_argument("--vad", dest="use_vad", action="store_true", default=None, help="пропускать тишину и музыку")
+    parser.add_argument("--g4f-correction", dest="use_g4f_correction", action=argparse.BooleanOptionalAction,
+                        default=None, help="коррекция текста через g4f")
+    parser.add_argument("--g4f-model")
+    parser.add_argument("--ocr", dest="use_ocr_mode", action="store_true", default=None,
+                        help="извлекать вшитые субтитры OCR вместо распознавания речи")
+    parser.add_argument("--ocr-engine", choices=["tesseract", "easyocr"])
+    parser.add_argument("--ocr-language")
+    parser.add_argument("--subtitle-region", type=int, nargs=4, metavar=("X", "Y", "W", "H"))
+    parser.add_argument("--translate", nargs="+", metavar="LANG", default=[],
+                        help="перевести результат на указанные языки")
+    parser.add_argument("--policy", dest="scheduler_policy", choices=POLICIES,
+                        help="порядок обработки файлов (по умолчанию из настроек)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="сколько файлов обрабатывать одновременно")
+    parser.add_argument("-q", "--quiet", action="store_true", help="не печатать журнал и ETA, только прогресс и итоги")
+    return parser
+
+
+def _option(args, config: AppConfig, name: str):
+    value = getattr(args, name)
+    return config.get(name) if value is None else value
+
+
+def make_task(path: Path, index: int, args, config: AppConfig) -> TranscriptionTask:
+    """Задача с теми же полями, что заполняет MainWindow.start_processing"""
+    output_dir = args.output_dir or Path(config.get("output_dir"))
+    task = TranscriptionTask(
+        video_path=path,
+        output_dir=output_dir,
+        output_format=_option(args, config, "output_format"),
+        language=_option(args, config, "language"),
+        model_size=_option(args, config, "model_size"),
+        task_id=f"cli_{index}",
+    )
+    task.device = _option(args, config, "device")
+    task.use_g4f_correction = bool(_option(args, config, "use_g4f_correction"))
+    task.g4f_model = _option(args, config, "g4f_model")
+    task.g4f_max_concurrency = int(config.get("g4f_max_concurrency"))
+    task.g4f_batch_tokens = int(config.get("g4f_batch_tokens"))
+    task.g4f_stream = bool(config.get("g4f_stream"))
+    task.g4f_correction_mode = config.get("g4f_correction_mode")
+    task.g4f_min_avg_logprob = float(config.get("g4f_min_avg_logprob"))
+    task.g4f_max_compression_ratio = float(config.get("g4f_max_compression_ratio"))
+    task.g4f_no_speech_threshold = float(config.get("g4f_no_speech_threshold"))
+    task.g4f_context_lines = int(config.get("g4f_context_lines"))
+    task.use_vad = bool(_option(args, config, "use_vad"))
+    task.use_parallel_chunks = bool(config.get("use_parallel_chunks"))
+    task.chunk_window_sec = float(config.get("chunk_window_sec"))
+    task.chunk_overlap_sec = float(config.get("chunk_overlap_sec"))
+    task.chunk_processes = int(config.get("chunk_processes"))
+    task.checkpoint_window_sec = float(config.get("checkpoint_window_sec"))
+    task.use_ocr_mode = bool(_option(args, config, "use_ocr_mode"))
+    task.ocr_engine = _option(args, config, "ocr_engine") or "tesseract"
+    task.ocr_language = _option(args, config, "ocr_language") or "eng"
+    task.subtitle_region = tuple(args.subtitle_region) if args.subtitle_region else config.get("subtitle_region")
+    return task
+
+
+_redirect_lock = threading.Lock()
+_redirect_depth = 0
+_real_stdout = None
+
+
+@contextmanager
+def _stdout_to_stderr():
+    """Пока работают воркеры, их отладочный print() уходит в stderr и не ломает JSON Lines.
+
+    sys.stdout общий на процесс, а задачи идут в нескольких потоках, поэтому подмена
+    снимается только при выходе последнего из вложенных блоков.
+    """
+    global _redirect_depth, _real_stdout
+    with _redirect_lock:
+        if _redirect_depth == 0:
+            _real_stdout, sys.stdout = sys.stdout, sys.stderr
+        _redirect_depth += 1
+    try:
+        yield
+    finally:
+        with _redirect_lock:
+            _redirect_depth -= 1
+            if _redirect_depth == 0:
+                sys.stdout = _real_stdout
+
+
+def _connect(signal, slot):
+    # Событийного цикла Qt нет, поэтому слоты вызываются прямо в потоке, который отправил сигнал
+    signal.connect(slot, Qt.ConnectionType.DirectConnection)
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    reporter = JsonLinesReporter(quiet=args.quiet, stream=sys.stdout)
+    try:
+        return run(args, reporter)
+    except KeyboardInterrupt:
+        reporter.emit("interrupted")
+        return EXIT_INTERRUPTED
+
+
+def run(args, reporter: JsonLinesReporter) -> int:
+    config = AppConfig(args.config)
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        reporter.emit("error", message="Входные файлы не найдены", inputs=args.inputs)
+        return EXIT_USAGE
+    tasks = [make_task(path, i, args, config) for i, path in enumerate(inputs, 1)]
+    policy = _option(args, config, "scheduler_policy")
+    if policy in ("shortest", "deadline"):
+        from .audio import media_duration
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            for task, duration in zip(tasks, pool.map(media_duration, inputs)):
+                task.duration_sec = duration
+                task.cost = estimate_cost(task)
+    tasks = [task for seq, task in sorted(enumerate(tasks), key=lambda e: sort_key(e[1], e[0], policy))]
+    for task in tasks:
+        task.output_dir.mkdir(parents=True, exist_ok=True)
+    files: Dict[str, str] = {task.task_id: str(task.video_path) for task in tasks}
+    results: Dict[str, dict] = {task.task_id: {"file": files[task.task_id]} for task in tasks}
+
+    from . import g4f_client, rate_limiter
+    g4f_client.configure(api_base=config.get("g4f_api_base"), timeout=float(config.get("g4f_timeout_sec")),
+                         log=lambda level, message: reporter.emit("log", level=level, message=message))
+    rate_limiter.configure_from(config)
+
+    # Воркеры импортируются здесь: модуль не тянет QtWidgets, а whisper/torch грузятся при первой задаче
+    cache_dir = Path(config.get("cache_dir"))
+    if any(task.use_ocr_mode for task in tasks):
+        from .video_ocr_worker import VideoOCRWorker
+        worker = VideoOCRWorker()
+    else:
+        from .worker import TranscriptionWorker
+        from .result_cache import ResultCache
+        from .audio_cache import AudioCache
+        from .correction_cache import CorrectionCache
+        worker = TranscriptionWorker(
+            max_slots=args.jobs,
+            result_cache=ResultCache(cache_dir / "results", float(config.get("result_cache_max_mb")))
+            if config.get("use_result_cache") else None,
+            checkpoint_dir=cache_dir / "checkpoints" if config.get("use_checkpoints") else None,
+            audio_cache=AudioCache(cache_dir / "audio", float(config.get("audio_cache_max_mb")))
+            if config.get("use_audio_cache") else None,
+            correction_cache=CorrectionCache(cache_dir / "corrections", float(config.get("correction_cache_max_mb")))
+            if config.get("use_correction_cache") else None,
+        )
+        _connect(worker.progress_details, lambda task_id, eta, speed: reporter.emit(
+            "details", task_id=task_id, file=files[task_id], eta_sec=round(eta, 1), speed=round(speed, 2)))
+        _connect(worker.correction_selected, lambda task_id, sent, total: reporter.emit(
+            "correction", task_id=task_id, file=files[task_id], sent=sent, total=total))
+
+    def on_completed(task_id: str, output_path: str):
+        results[task_id].update(status="completed", output=output_path)
+        reporter.emit("completed", task_id=task_id, file=files[task_id], output=output_path)
+
+    def on_failed(task_id: str, error: str):
+        results[task_id].update(status="failed", error=error)
+        reporter.emit("failed", task_id=task_id, file=files[task_id], error=error)
+
+    _connect(worker.progress_updated, lambda task_id, progress: reporter.emit(
+        "progress", task_id=task_id, file=files[task_id], progress=progress))
+    _connect(worker.task_completed, on_completed)
+    _connect(worker.task_failed, on_failed)
+    _connect(worker.log_message, lambda level, message: reporter.emit("log", level=level, message=message))
+
+    translator = None
+    translations: Dict[str, dict] = {}
+    if args.translate:
+        from .translator import TranslationWorker, TranslationTask
+        from .translation_memory import TranslationMemory
+        translator = TranslationWorker(
+            memory=TranslationMemory(cache_dir / "translation_cache", float(config.get("translation_memory_max_mb")))
+            if config.get("use_translation_memory") else None,
+            max_languages=int(config.get("translate_max_languages")),
+            backend=config.get("translation_backend"),
+            g4f_concurrency=int(config.get("g4f_max_concurrency")),
+            window_lines=int(config.get("translate_window_lines")))
+        _connect(translator.language_completed,
+                 lambda task_id, lang, path: translations[f"{task_id}_{lang}"].update(output=path))
+        _connect(translator.language_failed,
+                 lambda task_id, lang, error: translations[f"{task_id}_{lang}"].update(error=error))
+        _connect(translator.language_progress, lambda task_id, lang, progress: reporter.emit(
+            "translation_progress", task_id=task_id, file=files[task_id], target_lang=lang, progress=progress))
+        _connect(translator.log_message, lambda level, message: reporter.emit("log", level=level, message=message))
+
+    def run_one(task: TranscriptionTask):
+        reporter.emit("started", task_id=task.task_id, file=files[task.task_id])
+        with _stdout_to_stderr():
+            worker.process(task)
+        result = results[task.task_id]
+        if translator is None or result.get("status") != "completed":
+            return
+        result["translations"] = {}
+        for lang in args.translate:
+            translations[f"{task.task_id}_{lang}"] = result["translations"][lang] = {}
+        # Одна задача на все языки: файл разбирается один раз, языки переводятся параллельно
+        with _stdout_to_stderr():
+            _, error = translator.process(TranslationTask(
+                task_id=task.task_id,
+                source_path=Path(result["output"]),
+                target_lang=args.translate[0],
+                use_g4f=bool(config.get("use_g4f_translation")),
+                g4f_model=_option(args, config, "g4f_model"),
+                source_lang=task.language,
+                target_langs=tuple(args.translate) if len(args.translate) > 1 else (),
+            ))
+        for lang in args.translate:
+            entry = translations[f"{task.task_id}_{lang}"]
+            if not entry and error:
+                entry["error"] = error
+            reporter.emit("translated", task_id=task.task_id, file=files[task.task_id], target_lang=lang, **entry)
+
+    started = time.perf_counter()
+    try:
+        if args.jobs > 1 and not any(task.use_ocr_mode for task in tasks):
+            with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+                list(pool.map(run_one, tasks))
+        else:
+            for task in tasks:
+                run_one(task)
+    finally:
+        g4f_client.shutdown()
+
+    failed = [r for r in results.values() if r.get("status") != "completed"
+              or any("error" in t for t in r.get("translations", {}).values())]
+    reporter.emit("summary", total=len(tasks), failed=len(failed),
+                  elapsed_sec=round(time.perf_counter() - started, 1), results=list(results.values()))
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,6 +16,50 @@ class AppConfig:
             "use_g4f_correction": True,
             "use_g4f_translation": True,
             "g4f_model": "gpt-4o-mini",
+            "g4f_max_concurrency": 4,
+            "g4f_timeout_sec": 120,
+            "g4f_batch_tokens": 1000,
+            "g4f_stream": True,  # потоковые ответы (SSE); если провайдер не умеет, ответ читается целиком
+            # Коррекция только неуверенных сегментов Whisper: all или low_confidence
+            "g4f_correction_mode": "low_confidence",
+            "g4f_min_avg_logprob": -0.5,
+            "g4f_max_compression_ratio": 2.2,
+            "g4f_no_speech_threshold": 0.5,
+            "g4f_context_lines": 1,
+            # Общие на процесс лимиты запросов (token bucket): в секунду и подряд без ожидания; 0 — без ограничения
+            "g4f_rate_limit_rps": 0,
+            "g4f_rate_limit_burst": 4,
+            "translate_rate_limit_rps": 10,
+            "translate_rate_limit_burst": 5,
+            "translate_max_languages": 3,  # языков, переводимых одновременно в одной задаче
+            # Бэкенд перевода: auto (g4f при use_g4f_translation, иначе offline), offline, g4f, stub
+            "translation_backend": "auto",
+            "translate_window_lines": 500,  # субтитров в окне потокового перевода SRT
+            "g4f_api_base": "",  # OpenAI-совместимый адрес, например http://localhost:1337/v1; пусто — g4f.client
+            "use_vad": False,
+            "use_parallel_chunks": False,
+            "chunk_window_sec": 600,
+            "chunk_overlap_sec": 5,
+            "chunk_processes": 0,
+            "max_concurrent_tasks": 0,  # 0 — по числу ядер и памяти под модель
+            "model_cache_budget_gb": 0,  # 0 — половина оперативной памяти
+            "model_idle_timeout_sec": 600,
+            # Кэши на диске
+            "cache_dir": str(Path.home() / ".video-transcriber" / "cache"),
+            "use_result_cache": True,
+            "result_cache_max_mb": 512,
+            "use_audio_cache": True,
+            "audio_cache_max_mb": 4096,
+            "use_correction_cache": True,
+            "correction_cache_max_mb": 64,
+            "use_translation_memory": True,
+            "translation_memory_max_mb": 256,
+            "use_checkpoints": True,
+            "checkpoint_window_sec": 300,
+            # Порядок очереди: fifo, shortest (короткие раньше), priority, deadline
+            "scheduler_policy": "shortest",
+            # Очередь заданий в SQLite (пустая строка — очередь только в памяти)
+            "job_store_path": str(Path.home() / ".video-transcriber" / "jobs.sqlite3"),
             # OCR настройки
             "use_ocr_mode": False,
             "ocr_engine": "tesseract",
@@ -0,0 +1,31 @@
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+from .hashing import normalize_line
+from .sqlite_cache import SqliteLruCache
+
+
+def correction_key(text: str, model: str, lang_hint: str) -> str:
+    data = "\0".join((model, lang_hint, normalize_line(text))).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class CorrectionCache(SqliteLruCache):
+    """Кэш исправленных g4f строк в SQLite: ключ — хеш нормализованной строки, модели и языка.
+
+    Повторяющиеся фразы (заставки, дисклеймеры) и повторная обработка файла не уходят в сеть.
+    """
+
+    filename = "corrections.sqlite3"
+    table = "corrections"
+    title = "Кэш коррекции"
+
+    def __init__(self, cache_dir: Path, max_mb: float = 64):
+        super().__init__(cache_dir, max_mb)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        return self._get_many((), keys)
+
+    def put_many(self, items: Iterable[Tuple[str, str]]):
+        self._put_many((), dict(items))
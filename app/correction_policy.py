@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+from typing import List, Set, Tuple
+
+
+@dataclass
+class CorrectionPolicy:
+    """Какие сегменты Whisper отправлять на коррекцию в g4f.
+
+    В режиме low_confidence отправляются только сегменты, в которых Whisper не уверен:
+    низкий avg_logprob, высокий compression_ratio (повторы, «зацикливание») или высокая
+    no_speech_prob при непустом тексте (вероятная галлюцинация на тишине). Сегменты без
+    этих полей считаются неуверенными. Соседи в пределах context строк уходят вместе с ними
+    как контекст, но их текст не меняется.
+    """
+    mode: str = "low_confidence"
+    min_avg_logprob: float = -0.5
+    max_compression_ratio: float = 2.2
+    no_speech_threshold: float = 0.5
+    context: int = 1
+
+    @classmethod
+    def from_task(cls, task) -> "CorrectionPolicy":
+        return cls(task.g4f_correction_mode, task.g4f_min_avg_logprob, task.g4f_max_compression_ratio,
+                   task.g4f_no_speech_threshold, task.g4f_context_lines)
+
+    def is_low_confidence(self, segment: dict) -> bool:
+        try:
+            return (segment["avg_logprob"] < self.min_avg_logprob
+                    or segment["compression_ratio"] > self.max_compression_ratio
+                    or segment["no_speech_prob"] > self.no_speech_threshold)
+        except (KeyError, TypeError):
+            return True
+
+    def select(self, segments: List[dict]) -> Tuple[List[int], Set[int]]:
+        """(индексы отправляемых сегментов по порядку, индексы сегментов, текст которых заменяется)"""
+        if self.mode != "low_confidence":
+            targets = set(range(len(segments)))
+            return sorted(targets), targets
+        targets = {i for i, seg in enumerate(segments) if seg.get('text', '').strip() and self.is_low_confidence(seg)}
+        sent = set()
+        for i in targets:
+            sent.update(range(max(0, i - self.context), min(len(segments), i + self.context + 1)))
+        return sorted(sent), targets
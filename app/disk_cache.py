@@ -0,0 +1,66 @@
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+class SizeBoundedCache:
+    """Папка с файлами кэша, размер которой ограничен max_mb.
+
+    Время последнего обращения к записи хранится в mtime её файла; при превышении лимита
+    первыми удаляются файлы, к которым дольше всего не обращались (LRU).
+    """
+
+    pattern = "*"
+
+    def __init__(self, cache_dir: Path, max_mb: float):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _touch(path: Path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries = []
+        for path in self.cache_dir.glob(self.pattern):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self, keep: Optional[Path] = None):
+        """keep — только что записанный файл: он не удаляется, даже если один превышает лимит"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                # Файл занят (например, открыт через mmap в Windows) — пропускаем
+                pass
+
+    def stats(self) -> Tuple[int, int]:
+        """Число записей и их суммарный размер в байтах"""
+        entries = self._entries()
+        return len(entries), sum(size for _, size, _ in entries)
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
@@ -1,5 +1,14 @@
-from typing import List
-from g4f.client import Client
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional
+from urllib.parse import urlsplit
+
+from . import rate_limiter
+from .correction_cache import CorrectionCache, correction_key
+from .hashing import normalize_line
 
 
 def _first_choice_text(resp) -> str:
@@ -9,15 +18,309 @@ def _first_choice_text(resp) -> str:
         return ""
 
 
-def g4f_complete(messages: List[dict], model: str) -> str:
-    client = Client()
-    resp = client.chat.completions.create(model=model, messages=messages)
-    return _first_choice_text(resp)
+class _LineSplitter:
+    """Собирает потоковый ответ по кускам и отдаёт on_line каждую законченную строку"""
 
+    def __init__(self, on_line: Callable[[str], None]):
+        self.on_line = on_line
+        self.parts: List[str] = []
+        self._tail = ""
 
-def g4f_batch_rewrite(lines: List[str], model: str, lang_hint: str = "") -> List[str]:
-    if not lines:
-        return []
+    def feed(self, chunk: str):
+        if not chunk:
+            return
+        self.parts.append(chunk)
+        *lines, self._tail = (self._tail + chunk).split("\n")
+        for line in lines:
+            self.on_line(line)
+
+    def close(self) -> str:
+        if self._tail:
+            self.on_line(self._tail)
+            self._tail = ""
+        return "".join(self.parts).strip()
+
+
+class G4FClientPool:
+    """Долгоживущие клиенты g4f и keep-alive соединения к OpenAI-совместимому API.
+
+    Клиент или соединение берётся из пула на время одного запроса и возвращается обратно,
+    поэтому пул можно использовать из нескольких потоков, а TCP/TLS-соединения и клиенты
+    g4f не создаются на каждый батч. Если api_base пуст, запросы идут через g4f.client.
+    """
+
+    def __init__(self, api_base: str = "", timeout: float = 120.0, max_idle: int = 8,
+                 log: Optional[Callable[[str, str], None]] = None):
+        self.api_base = (api_base or "").rstrip("/")
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._log = log or (lambda level, message: None)
+        self._idle_connections: List[http.client.HTTPConnection] = []
+        self._idle_clients: List[object] = []
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.total_latency = 0.0
+
+    def complete(self, messages: List[dict], model: str, timeout: Optional[float] = None,
+                 on_line: Optional[Callable[[str], None]] = None) -> str:
+        """Полный текст ответа; с on_line ответ запрашивается потоком и каждая строка отдаётся сразу"""
+        # Общий на процесс лимит запросов к провайдеру; ожидание не входит в задержку ответа
+        rate_limiter.acquire("g4f")
+        started = time.perf_counter()
+        try:
+            if self.api_base:
+                text, reused = self._http_complete(messages, model, timeout or self.timeout, on_line)
+            else:
+                text, reused = self._g4f_complete(messages, model, timeout or self.timeout, on_line)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.requests += 1
+            self.total_latency += elapsed
+        self._log("debug", f"g4f: ответ за {elapsed * 1000:.0f} мс "
+                           f"({'повторное' if reused else 'новое'} соединение)")
+        return text
+
+    def _g4f_complete(self, messages: List[dict], model: str, timeout: float,
+                      on_line: Optional[Callable[[str], None]] = None):
+        with self._lock:
+            client = self._idle_clients.pop() if self._idle_clients else None
+            reused = client is not None
+            if reused:
+                self.reused_connections += 1
+            else:
+                self.new_connections += 1
+        if client is None:
+            from g4f.client import Client
+            client = Client()
+        extra = {"stream": True} if on_line else {}
+        try:
+            resp = client.chat.completions.create(model=model, messages=messages, timeout=timeout, **extra)
+        except TypeError:
+            # Старые версии g4f не принимают timeout
+            resp = client.chat.completions.create(model=model, messages=messages, **extra)
+        if on_line:
+            splitter = _LineSplitter(on_line)
+            for chunk in resp:
+                try:
+                    splitter.feed(chunk.choices[0].delta.content or "")
+                except (AttributeError, IndexError):
+                    continue
+            text = splitter.close()
+        else:
+            text = _first_choice_text(resp)
+        with self._lock:
+            if len(self._idle_clients) < self.max_idle:
+                self._idle_clients.append(client)
+        return text, reused
+
+    def _connect(self) -> http.client.HTTPConnection:
+        parts = urlsplit(self.api_base)
+        cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        return cls(parts.hostname, parts.port, timeout=self.timeout)
+
+    def _http_complete(self, messages: List[dict], model: str, timeout: float,
+                       on_line: Optional[Callable[[str], None]] = None):
+        request = {"model": model, "messages": messages}
+        if on_line:
+            request["stream"] = True
+        body = json.dumps(request).encode("utf-8")
+        path = urlsplit(self.api_base).path + "/chat/completions"
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        with self._lock:
+            conn = self._idle_connections.pop() if self._idle_connections else None
+        reused = conn is not None
+        for attempt in range(2):
+            if conn is None:
+                conn = self._connect()
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                resp = conn.getresponse()
+                text = self._read_response(resp, on_line)
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                conn = None
+                if not reused or attempt:
+                    raise
+                # Сервер закрыл простаивавшее соединение — повторяем один раз на новом
+                reused = False
+            except Exception:
+                conn.close()
+                raise
+        with self._lock:
+            if reused:
+                self.reused_connections += 1
+            else:
+                self.new_connections += 1
+            if not resp.will_close and len(self._idle_connections) < self.max_idle:
+                self._idle_connections.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+        if resp.status >= 400:
+            raise RuntimeError(f"API вернул HTTP {resp.status}")
+        return text, reused
+
+    @staticmethod
+    def _read_response(resp, on_line: Optional[Callable[[str], None]]) -> str:
+        """Читает ответ целиком (и для повторного использования соединения — до конца)"""
+        if resp.status < 400 and on_line and "text/event-stream" in (resp.getheader("Content-Type") or ""):
+            # Server-Sent Events: строки "data: {chunk}", завершается "data: [DONE]"
+            splitter = _LineSplitter(on_line)
+            while True:
+                raw = resp.readline()
+                if not raw:
+                    break
+                line = raw.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    resp.read()
+                    break
+                try:
+                    splitter.feed(json.loads(data)["choices"][0]["delta"].get("content") or "")
+                except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                    continue
+            return splitter.close()
+        data = resp.read()
+        if resp.status >= 400:
+            return ""
+        try:
+            text = json.loads(data.decode("utf-8"))["choices"][0]["message"]["content"].strip()
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            return ""
+        if on_line:
+            # Сервер не поддерживает поток — отдаём строки готового ответа
+            splitter = _LineSplitter(on_line)
+            splitter.feed(text)
+            splitter.close()
+        return text
+
+    def stats_summary(self) -> str:
+        with self._lock:
+            average = self.total_latency / self.requests * 1000 if self.requests else 0.0
+            return (f"g4f: запросов {self.requests}, ошибок {self.failures}, "
+                    f"соединений новых {self.new_connections}, повторно {self.reused_connections}, "
+                    f"средний ответ {average:.0f} мс; лимит: {rate_limiter.get('g4f').stats_summary()}")
+
+    def shutdown(self):
+        with self._lock:
+            connections, self._idle_connections = self._idle_connections, []
+            self._idle_clients = []
+        for conn in connections:
+            conn.close()
+
+
+_pool = G4FClientPool()
+_pool_lock = threading.Lock()
+
+
+def configure(api_base: str = "", timeout: float = 120.0, log: Optional[Callable[[str, str], None]] = None):
+    """Заменяет общий пул клиентов; log(level, message) получает задержки запросов"""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, G4FClientPool(api_base, timeout, log=log)
+    old.shutdown()
+
+
+def shutdown():
+    _pool.shutdown()
+
+
+def stats_summary() -> str:
+    return _pool.stats_summary()
+
+
+def g4f_complete(messages: List[dict], model: str, timeout: Optional[float] = None,
+                 on_line: Optional[Callable[[str], None]] = None) -> str:
+    return _pool.complete(messages, model, timeout, on_line)
+
+
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов: ~4 байта UTF-8 на токен (кириллица выходит ~2 символа на токен)"""
+    return len(text.encode("utf-8")) // 4 + 1
+
+
+def token_batches(texts: List[str], max_tokens: int, max_lines: int = 200) -> List[List[int]]:
+    """Индексы строк, разбитые на батчи не больше max_tokens оценочных токенов"""
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for index, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (used + tokens > max_tokens or len(current) >= max_lines):
+            batches.append(current)
+            current, used = [], 0
+        current.append(index)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+# Глубина деления батча при неверном числе строк: не больше 2**(глубина+1)-1 запросов на батч
+MAX_BISECT_DEPTH = 4
+# Допустимое расхождение числа строк в ответе, при котором батч ещё имеет смысл делить
+BISECT_TOLERANCE = 0.25
+
+
+def _bisect_batch(lines: List[str], send: Callable[[List[str], int], List[str]],
+                  offset: int = 0, depth: int = 0) -> List[Optional[str]]:
+    """send(строки, смещение в исходном батче) возвращает строки ответа модели.
+
+    Если их число не совпало, но близко к отправленному, батч делится пополам и отправляется
+    снова — не глубже MAX_BISECT_DEPTH. Пустой ответ или ответ с сильно другим числом строк
+    означает сбой модели, а не одну «трудную» строку: такой батч целиком получает None
+    (строки остаются без изменений) без повторных запросов.
+    """
+    parts = send(lines, offset)
+    if len(parts) == len(lines):
+        return parts
+    near = parts and abs(len(parts) - len(lines)) <= max(1, int(len(lines) * BISECT_TOLERANCE))
+    if len(lines) == 1 or depth >= MAX_BISECT_DEPTH or not near:
+        return [None] * len(lines)
+    middle = len(lines) // 2
+    return (_bisect_batch(lines[:middle], send, offset, depth + 1)
+            + _bisect_batch(lines[middle:], send, offset + middle, depth + 1))
+
+
+def _line_emitter(count: int, on_line: Optional[Callable[[int, str], None]], offset: int,
+                  skip_empty: bool) -> Optional[Callable[[str], None]]:
+    """Нумерует строки потокового ответа и передаёт on_line(индекс, текст); лишние строки отбрасываются.
+
+    Строки предварительные: если в конце число строк не совпадёт, батч будет отправлен
+    повторно и те же индексы придут снова с новым текстом.
+    """
+    if on_line is None:
+        return None
+    received = 0
+
+    def emit(line: str):
+        nonlocal received
+        line = line.strip()
+        if skip_empty and not line:
+            return
+        if received < count:
+            on_line(offset + received, line)
+        received += 1
+
+    return emit
+
+
+def _rewrite_batch(lines: List[str], model: str, lang_hint: str = "", on_line: Optional[Callable[[int, str], None]] = None,
+                   offset: int = 0) -> List[str]:
+    """Непустые строки ответа; их число может не совпасть с отправленным"""
     sep = "|||"
     payload = f"{sep}".join([l.replace('\n', ' ').strip() for l in lines])
     sys = "You are a precise text corrector. Fix recognition mistakes by context, keep the same language, style and meaning. Do not add or remove information. Preserve line count and order. Return exactly the same number of lines, separated by newline only."
@@ -28,26 +331,119 @@ def g4f_batch_rewrite(lines: List[str], model: str, lang_hint: str = "") -> List
         {"role": "user",
          "content": f"Input lines separated by {sep}:\n{payload}\nReturn corrected lines as raw text with newline separators only."}
     ]
-    out = g4f_complete(msgs, model)
-    parts = [p.strip() for p in out.splitlines() if p.strip() != ""]
-    if len(parts) != len(lines):
-        return lines
-    return parts
+    out = g4f_complete(msgs, model, on_line=_line_emitter(len(lines), on_line, offset, skip_empty=True))
+    return [p.strip() for p in out.splitlines() if p.strip() != ""]
 
 
-def g4f_batch_translate(lines: List[str], model: str, target_lang: str, source_lang: str = "auto") -> List[str]:
+def g4f_batch_rewrite(lines: List[str], model: str, lang_hint: str = "",
+                      on_line: Optional[Callable[[int, str], None]] = None) -> List[str]:
+    """С on_line(индекс, текст) ответ читается потоком и строки отдаются по мере генерации"""
     if not lines:
         return []
-    clean = [l.replace('\n', ' ').strip() for l in lines]
-    joined = "\n".join(clean)
+    result = _bisect_batch(lines, lambda part, offset: _rewrite_batch(part, model, lang_hint, on_line, offset))
+    return [new if new is not None else old for new, old in zip(result, lines)]
+
+
+def g4f_rewrite_lines(lines: List[str], model: str, lang_hint: str = "", max_tokens: int = 1000,
+                      max_concurrency: int = 4, on_batch_done: Optional[Callable[[int, int], None]] = None,
+                      log: Optional[Callable[[str, str], None]] = None,
+                      cache: Optional[CorrectionCache] = None,
+                      on_line: Optional[Callable[[int, str], None]] = None) -> List[str]:
+    """Коррекция строк батчами до max_tokens, не больше max_concurrency запросов одновременно.
+
+    Одинаковые строки отправляются один раз, а с cache — только те, которых нет в кэше.
+    Батч с немного неверным числом строк в ответе делится пополам и отправляется повторно
+    (см. _bisect_batch), так что без изменений остаются только строки, на которых модель
+    сбивается; пустой или бессвязный ответ оставляет батч как есть. Батч, запрос которого
+    упал, возвращается без изменений и не задерживает остальные. Порядок строк сохраняется,
+    on_batch_done(готово, всего) вызывается после каждого батча. С on_line(индекс, текст)
+    ответы читаются потоком: строки из кэша отдаются сразу, остальные — по мере генерации
+    (для повторяющихся строк — по каждому индексу; см. _line_emitter).
+    """
+    log = log or (lambda level, message: None)
+    keys = [correction_key(line, model, lang_hint) for line in lines]
+    corrected = cache.get_many(keys) if cache is not None else {}
+    from_cache = len(set(keys) & corrected.keys())
+    # Уникальные строки без ответа из кэша в порядке первого появления
+    pending = {}
+    for key, line in zip(keys, lines):
+        if key not in corrected and key not in pending:
+            pending[key] = normalize_line(line)
+    pending_keys = list(pending)
+    batches = [[pending_keys[i] for i in batch]
+               for batch in token_batches([pending[key] for key in pending_keys], max_tokens)]
+    if len(pending) < len(lines):
+        log("info", f"Коррекция: строк {len(lines)}, к отправке {len(pending)} "
+                    f"(повторы и кэш: {len(lines) - len(pending)})")
+    positions = {}
+    if on_line:
+        for i, key in enumerate(keys):
+            if key in corrected:
+                on_line(i, corrected[key])
+            else:
+                positions.setdefault(key, []).append(i)
+
+    def rewrite(index: int) -> Optional[List[str]]:
+        batch = [pending[key] for key in batches[index]]
+        emit = None
+        if on_line:
+            def emit(position: int, text: str):
+                for i in positions[batches[index][position]]:
+                    on_line(i, text)
+        try:
+            result = _bisect_batch(batch, lambda part, offset: _rewrite_batch(part, model, lang_hint, emit, offset))
+        except Exception as e:
+            log("warning", f"Коррекция батча {index + 1}/{len(batches)} не удалась, строки оставлены как есть: {e}")
+            return None
+        if cache is not None:
+            cache.put_many((key, text) for key, text in zip(batches[index], result) if text is not None)
+        return result
+
+    if batches:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(batches))),
+                                thread_name_prefix="g4f-batch") as pool:
+            futures = {pool.submit(rewrite, i): i for i in range(len(batches))}
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                if result is not None:
+                    corrected.update((key, text) for key, text in zip(batches[futures[future]], result)
+                                     if text is not None)
+                if on_batch_done:
+                    on_batch_done(done, len(batches))
+    answered = len(corrected) - from_cache
+    log("info", f"Коррекция: уникальных строк {len(set(keys))}, исправлено моделью {answered}, "
+                f"из кэша {from_cache}, оставлено как есть {len(pending) - answered}")
+    return [corrected.get(key, line) for key, line in zip(keys, lines)]
+
+
+def _translate_batch(lines: List[str], model: str, target_lang: str, source_lang: str,
+                     on_line: Optional[Callable[[int, str], None]] = None, offset: int = 0) -> List[str]:
+    joined = "\n".join(lines)
     sys = "You are a professional subtitle translator. Translate lines faithfully, concise, natural, keep timing segmentation implicit by preserving line boundaries. Do not add numbering, metadata, or quotes. Output exactly the same number of lines in the same order."
     msgs = [
         {"role": "system", "content": sys},
         {"role": "user",
          "content": f"Source language: {source_lang}. Target language: {target_lang}.\nTranslate each of these lines one-by-one, outputting the translations as newline-separated lines only:\n{joined}"}
     ]
-    out = g4f_complete(msgs, model)
-    parts = [p.strip() for p in out.splitlines()]
-    if len(parts) != len(clean):
-        return clean
-    return parts
+    out = g4f_complete(msgs, model, on_line=_line_emitter(len(lines), on_line, offset, skip_empty=False))
+    return [p.strip() for p in out.splitlines()]
+
+
+def g4f_translate_lines(lines: List[str], model: str, target_lang: str, source_lang: str = "auto",
+                        on_line: Optional[Callable[[int, str], None]] = None) -> List[Optional[str]]:
+    """Перевод с повтором половинами при неверном числе строк; для непереведённых строк — None.
+
+    С on_line(индекс, текст) ответ читается потоком и строки отдаются по мере генерации.
+    """
+    if not lines:
+        return []
+    clean = [l.replace('\n', ' ').strip() for l in lines]
+    return _bisect_batch(clean, lambda part, offset: _translate_batch(part, model, target_lang, source_lang,
+                                                                      on_line, offset))
+
+
+def g4f_batch_translate(lines: List[str], model: str, target_lang: str, source_lang: str = "auto",
+                        on_line: Optional[Callable[[int, str], None]] = None) -> List[str]:
+    """Как g4f_translate_lines, но непереведённые строки возвращаются как есть"""
+    result = g4f_translate_lines(lines, model, target_lang, source_lang, on_line)
+    return [new if new is not None else old.replace('\n', ' ').strip() for new, old in zip(result, lines)]
@@ -0,0 +1,40 @@
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict
+
+# Сколько байт читать из начала, середины и конца файла
+_SAMPLE_BYTES = 4 * 1024 * 1024
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def media_fingerprint(path: Path) -> str:
+    """Быстрый хэш содержимого медиафайла.
+
+    Хэшируется размер и три выборки по 4 МБ (начало, середина, конец): для многогигабайтных
+    видео это доли секунды, а любое перекодирование или обрезка меняет хотя бы одну выборку.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(size).encode())
+    with open(path, 'rb') as f:
+        if size <= 3 * _SAMPLE_BYTES:
+            digest.update(f.read())
+        else:
+            for offset in (0, size // 2 - _SAMPLE_BYTES // 2, size - _SAMPLE_BYTES):
+                f.seek(offset)
+                digest.update(f.read(_SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+def params_key(fingerprint: str, params: Dict[str, Any]) -> str:
+    """Ключ кэша: хэш медиа плюс параметры, влияющие на результат"""
+    payload = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(f"{fingerprint}|{payload}".encode('utf-8'), digest_size=16).hexdigest()
+
+
+def normalize_line(text: str) -> str:
+    """Строка в том виде, в каком её видит модель: без лишних пробелов и переносов"""
+    return _WHITESPACE_RE.sub(" ", text).strip()
@@ -0,0 +1,192 @@
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Поля задач, которые в JSON хранятся строками и при восстановлении снова становятся Path
+_PATH_FIELDS = {"video_path", "output_dir", "result_path", "source_path"}
+
+# Состояния задания: pending — добавлено, но не запущено; queued — ждёт воркера;
+# running — взято воркером; completed/failed — завершено
+ACTIVE_STATES = ("pending", "queued", "running")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    state TEXT NOT NULL,
+    params TEXT NOT NULL,
+    created REAL NOT NULL,
+    queued REAL,
+    started REAL,
+    finished REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    output TEXT,
+    error TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    cost REAL,
+    deadline REAL
+);
+"""
+
+# Колонки, добавленные после первой версии схемы: (имя, определение)
+_MIGRATIONS = [
+    ("priority", "INTEGER NOT NULL DEFAULT 0"),
+    ("cost", "REAL"),
+    ("deadline", "REAL"),
+]
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (kind, state, id);
+CREATE INDEX IF NOT EXISTS jobs_task ON jobs (task_id);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished);
+"""
+
+
+def task_to_params(task) -> Dict[str, Any]:
+    """TranscriptionTask (dataclass) или TranslationTask (кортеж с _fields) в JSON-совместимый словарь"""
+    items = asdict(task).items() if is_dataclass(task) else zip(task._fields, task)
+    return {key: str(value) if isinstance(value, Path) else value for key, value in items}
+
+
+def params_to_kwargs(params: Dict[str, Any]) -> Dict[str, Any]:
+    kwargs = dict(params)
+    for key in _PATH_FIELDS & kwargs.keys():
+        if kwargs[key] is not None:
+            kwargs[key] = Path(kwargs[key])
+    if isinstance(kwargs.get("subtitle_region"), list):
+        kwargs["subtitle_region"] = tuple(kwargs["subtitle_region"])
+    return kwargs
+
+
+class JobStore:
+    """Очередь заданий в SQLite, переживающая перезапуск и падение приложения.
+
+    База в режиме WAL: интерфейс читает, пока воркеры пишут. У каждого потока своё
+    соединение. Воркер забирает задание транзакцией BEGIN IMMEDIATE, поэтому одно задание
+    не достанется двум слотам. Прогресс в базу не пишется — только смена состояния,
+    так что запись не мешает интерфейсу даже при десятках тысяч заданий.
+    """
+
+    def __init__(self, path: Path, keep_finished_days: float = 30.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for name, definition in _MIGRATIONS:
+            if name not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+        conn.executescript(_INDEXES)
+        if keep_finished_days > 0:
+            conn.execute("DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?",
+                         (time.time() - keep_finished_days * 86400,))
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None — транзакции открываем явно, остальное в автокоммите
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save(self, kind: str, task, state: str = "pending") -> int:
+        """Добавляет задание или обновляет параметры ещё не завершённого задания с тем же task_id.
+
+        Задания перевода (kind="translation") всегда добавляются новой строкой:
+        один результат можно переводить на несколько языков.
+        """
+        return self.save_many(kind, [task], state)[0]
+
+    def save_many(self, kind: str, tasks, state: str = "pending") -> List[int]:
+        """То же для списка задач одной транзакцией — тысячи файлов добавляются без задержки интерфейса"""
+        now = time.time()
+        queued = now if state == "queued" else None
+        conn = self._conn()
+        job_ids = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for task in tasks:
+                params = json.dumps(task_to_params(task), ensure_ascii=False)
+                schedule = (getattr(task, "priority", 0), getattr(task, "cost", None), getattr(task, "deadline", None))
+                row = None
+                if kind != "translation":
+                    row = conn.execute(
+                        "SELECT id FROM jobs WHERE task_id = ? AND kind != 'translation' "
+                        "AND state IN ('pending', 'queued') ORDER BY id DESC LIMIT 1",
+                        (task.task_id,)).fetchone()
+                if row:
+                    conn.execute("UPDATE jobs SET kind = ?, state = ?, params = ?, queued = ?, "
+                                 "priority = ?, cost = ?, deadline = ? WHERE id = ?",
+                                 (kind, state, params, queued, *schedule, row[0]))
+                    job_ids.append(row[0])
+                else:
+                    job_ids.append(conn.execute(
+                        "INSERT INTO jobs (task_id, kind, state, params, created, queued, priority, cost, deadline) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (task.task_id, kind, state, params, now, queued, *schedule)).lastrowid)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return job_ids
+
+    def claim(self, kind: str, order_by: str = "id") -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Атомарно переводит первое по order_by (см. scheduler.order_by_sql) задание kind из queued в running"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(f"SELECT id, params FROM jobs WHERE kind = ? AND state = 'queued' "
+                               f"ORDER BY {order_by} LIMIT 1", (kind,)).fetchone()
+            if row:
+                conn.execute("UPDATE jobs SET state = 'running', started = ?, attempts = attempts + 1 WHERE id = ?",
+                             (time.time(), row[0]))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return (row[0], json.loads(row[1])) if row else None
+
+    def finish(self, job_id: int, output: Optional[str] = None, error: Optional[str] = None):
+        self._conn().execute("UPDATE jobs SET state = ?, finished = ?, output = ?, error = ? WHERE id = ?",
+                             ("failed" if error is not None else "completed", time.time(), output, error, job_id))
+
+    def set_priority(self, task_id: str, priority: int):
+        self._conn().execute(
+            "UPDATE jobs SET priority = ?, params = json_set(params, '$.priority', ?) "
+            "WHERE task_id = ? AND state IN ('pending', 'queued')", (priority, priority, task_id))
+
+    def set_duration(self, task_id: str, duration_sec: float, cost: Optional[float]):
+        """Длительность, узнанная после добавления задания"""
+        self._conn().execute(
+            "UPDATE jobs SET cost = ?, params = json_set(params, '$.duration_sec', ?, '$.cost', ?) "
+            "WHERE task_id = ? AND state IN ('pending', 'queued')", (cost, duration_sec, cost, task_id))
+
+    def unqueue(self, kind: str):
+        """Остановка обработки: ожидающие задания kind возвращаются в pending"""
+        self._conn().execute("UPDATE jobs SET state = 'pending', queued = NULL WHERE kind = ? AND state = 'queued'",
+                             (kind,))
+
+    def remove(self, task_id: str):
+        self._conn().execute("DELETE FROM jobs WHERE task_id = ? AND state IN ('pending', 'queued')", (task_id,))
+
+    def recover(self) -> int:
+        """После падения задания в running никто не выполняет — возвращаем их в очередь"""
+        return self._conn().execute("UPDATE jobs SET state = 'queued' WHERE state = 'running'").rowcount
+
+    def active_jobs(self) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """(kind, state, params) незавершённых заданий в порядке добавления"""
+        placeholders = ", ".join("?" * len(ACTIVE_STATES))
+        rows = self._conn().execute(
+            f"SELECT kind, state, params FROM jobs WHERE state IN ({placeholders}) ORDER BY id", ACTIVE_STATES)
+        return [(kind, state, json.loads(params)) for kind, state, params in rows]
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._conn().execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
@@ -0,0 +1,185 @@
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+# Примерный объём памяти одной модели Whisper, ГБ (по данным README openai-whisper)
+MODEL_MEMORY_GB = {
+    "tiny": 1.0,
+    "base": 1.0,
+    "small": 2.0,
+    "medium": 5.0,
+    "large": 10.0,
+}
+
+ModelKey = Tuple[str, str]
+
+
+def total_memory_gb(device: str = "cpu") -> Optional[float]:
+    """Объём памяти устройства в ГБ или None, если определить не удалось"""
+    if device == "cuda":
+        try:
+            import torch
+            if torch.cuda.is_available():
+                return torch.cuda.get_device_properties(0).total_memory / 1024 ** 3
+        except Exception:
+            return None
+        return None
+    try:
+        import psutil
+        return psutil.virtual_memory().total / 1024 ** 3
+    except ImportError:
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024 ** 3
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_slot_count(model_size: str, device: str = "cpu") -> int:
+    """Число одновременных задач: по ядрам CPU и по тому, сколько моделей влезает в память"""
+    by_cpu = max(1, (os.cpu_count() or 1) // 4)
+    memory = total_memory_gb(device)
+    if memory is None:
+        return by_cpu if device == "cpu" else 1
+    # Половину памяти оставляем системе, декодированному аудио и интерфейсу
+    by_memory = max(1, int(memory * 0.5 // MODEL_MEMORY_GB.get(model_size, 2.0)))
+    return by_memory if device == "cuda" else min(by_cpu, by_memory)
+
+
+def model_weights_gb(model) -> Optional[float]:
+    """Фактический объём весов загруженной модели"""
+    try:
+        return sum(p.numel() * p.element_size() for p in model.parameters()) / 1024 ** 3
+    except Exception:
+        return None
+
+
+@dataclass
+class _ResidentModel:
+    key: ModelKey
+    model: object
+    device: str
+    size_gb: float
+    last_used: float
+    in_use: bool = True
+
+
+class ModelRegistry:
+    """Резидентные модели Whisper с LRU-вытеснением по бюджету памяти.
+
+    Держит несколько моделей (разных размеров/устройств и копии одной модели для параллельных
+    слотов), пока их суммарный объём укладывается в budget_gb. Декодер Whisper на время
+    transcribe вешает на модель хуки kv-кэша, поэтому экземпляр выдаётся одной задаче за раз.
+    При нехватке бюджета выгружается давно не использованная свободная модель, а модели,
+    простаивающие дольше idle_timeout, выгружаются функцией unload_idle.
+    """
+
+    def __init__(self, loader: Callable[[str, str], Tuple[object, str]], budget_gb: float = 0.0,
+                 idle_timeout: float = 600.0, log: Optional[Callable[[str, str], None]] = None):
+        # loader(size, device) -> (модель, фактическое устройство)
+        self._loader = loader
+        self.budget_gb = budget_gb if budget_gb > 0 else (total_memory_gb() or 8.0) * 0.5
+        self.idle_timeout = idle_timeout
+        self._log = log or (lambda level, message: None)
+        self._entries: "OrderedDict[int, _ResidentModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_time = 0.0
+
+    def configure(self, budget_gb: Optional[float] = None, idle_timeout: Optional[float] = None):
+        with self._lock:
+            if budget_gb is not None and budget_gb > 0:
+                self.budget_gb = budget_gb
+            if idle_timeout is not None:
+                self.idle_timeout = idle_timeout
+            self._evict_over_budget(0.0)
+
+    def acquire(self, size: str, device: str) -> Tuple[object, str]:
+        key = (size, device)
+        with self._lock:
+            for entry_id, entry in reversed(self._entries.items()):
+                if entry.key == key and not entry.in_use:
+                    entry.in_use = True
+                    entry.last_used = time.monotonic()
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    self._log("debug", f"Модель '{size}' взята из кэша. {self.stats_summary()}")
+                    return entry.model, entry.device
+            self.misses += 1
+            self._evict_over_budget(MODEL_MEMORY_GB.get(size, 2.0))
+
+        started = time.perf_counter()
+        model, resolved_device = self._loader(size, device)
+        elapsed = time.perf_counter() - started
+        entry = _ResidentModel(key, model, resolved_device,
+                               model_weights_gb(model) or MODEL_MEMORY_GB.get(size, 2.0), time.monotonic())
+        with self._lock:
+            self.load_time += elapsed
+            self._entries[id(model)] = entry
+            self._log("info", f"Модель '{size}' загружена за {elapsed:.1f} сек. {self.stats_summary()}")
+        return model, resolved_device
+
+    def release(self, size: str, device: str, model, resolved_device: str):
+        with self._lock:
+            entry = self._entries.get(id(model))
+            if entry is None:
+                return
+            entry.in_use = False
+            entry.last_used = time.monotonic()
+            self._evict_over_budget(0.0)
+
+    def unload_idle(self):
+        """Выгружает свободные модели, которые простаивают дольше idle_timeout"""
+        if self.idle_timeout <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for entry_id, entry in list(self._entries.items()):
+                if not entry.in_use and now - entry.last_used > self.idle_timeout:
+                    self._unload(entry_id, "простой")
+
+    def clear(self):
+        with self._lock:
+            for entry_id, entry in list(self._entries.items()):
+                if not entry.in_use:
+                    self._unload(entry_id, "остановка")
+
+    def resident_gb(self) -> float:
+        return sum(entry.size_gb for entry in self._entries.values())
+
+    def stats_summary(self) -> str:
+        requests = self.hits + self.misses
+        hit_rate = self.hits / requests * 100 if requests else 0.0
+        return (f"Кэш моделей: {len(self._entries)} шт., {self.resident_gb():.1f}/{self.budget_gb:.1f} ГБ, "
+                f"попаданий {self.hits}, промахов {self.misses} ({hit_rate:.0f}%), "
+                f"вытеснений {self.evictions}, загрузка {self.load_time:.1f} сек")
+
+    def _evict_over_budget(self, incoming_gb: float):
+        # Вызывается под self._lock; OrderedDict упорядочен от давно использованных к недавним
+        for entry_id, entry in list(self._entries.items()):
+            if self.resident_gb() + incoming_gb <= self.budget_gb:
+                return
+            if not entry.in_use:
+                self._unload(entry_id, "бюджет памяти")
+        if self.resident_gb() + incoming_gb > self.budget_gb:
+            self._log("warning", f"Бюджет памяти моделей превышен: все модели заняты. {self.stats_summary()}")
+
+    def _unload(self, entry_id: int, reason: str):
+        entry = self._entries.pop(entry_id)
+        self.evictions += 1
+        device = entry.device
+        del entry
+        gc.collect()
+        if device == "cuda":
+            try:
+                import torch
+                torch.cuda.empty_cache()
+            except Exception:
+                pass
+        self._log("info", f"Модель выгружена ({reason}). {self.stats_summary()}")
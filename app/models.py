@@ -1,3 +1,4 @@
+import itertools
 import time
 from pathlib import Path
 from typing import Optional
@@ -5,6 +6,10 @@ from dataclasses import dataclass, field
 from enum import Enum
 
 
+# Несколько файлов, добавленных за одну миллисекунду, не должны получить одинаковый task_id
+_task_counter = itertools.count()
+
+
 class DeviceType(Enum):
     CPU = "cpu"
     CUDA = "cuda"
@@ -17,7 +22,7 @@ class TranscriptionTask:
     output_format: str
     language: str
     model_size: str
-    task_id: str = field(default_factory=lambda: f"task_{int(time.time() * 1000)}")
+    task_id: str = field(default_factory=lambda: f"task_{int(time.time() * 1000)}_{next(_task_counter)}")
     status: str = "pending"
     progress: int = 0
     result_path: Optional[Path] = None
@@ -25,6 +30,27 @@ class TranscriptionTask:
     device: str = "cpu"
     use_g4f_correction: bool = True
     g4f_model: str = "gpt-4o-mini"
+    g4f_max_concurrency: int = 4  # одновременных запросов коррекции
+    g4f_batch_tokens: int = 1000  # оценочный размер батча коррекции в токенах
+    g4f_stream: bool = True  # читать ответы потоком и двигать прогресс по мере генерации
+    # Какие сегменты отправлять на коррекцию (см. app/correction_policy.py)
+    g4f_correction_mode: str = "low_confidence"  # all, low_confidence
+    g4f_min_avg_logprob: float = -0.5
+    g4f_max_compression_ratio: float = 2.2
+    g4f_no_speech_threshold: float = 0.5
+    g4f_context_lines: int = 1
+    use_vad: bool = False  # пропускать тишину и музыку перед Whisper
+    # Параллельная транскрибация длинного файла окнами в пуле процессов
+    use_parallel_chunks: bool = False
+    chunk_window_sec: float = 600.0
+    chunk_overlap_sec: float = 5.0
+    chunk_processes: int = 0  # 0 — по числу ядер
+    checkpoint_window_sec: float = 300.0  # шаг сохранения готовых сегментов и частичного SRT
+    # Планировщик очереди (см. app/scheduler.py)
+    priority: int = 0  # больше — раньше при любой политике, кроме fifo
+    deadline: Optional[float] = None  # время Unix, к которому нужен результат
+    duration_sec: Optional[float] = None  # длительность файла, известна после проверки
+    cost: Optional[float] = None  # оценка стоимости: длительность × модель × режим
     # OCR режим
     use_ocr_mode: bool = False
     ocr_engine: str = "tesseract"  # tesseract, easyocr
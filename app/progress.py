@@ -0,0 +1,148 @@
+import importlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable, Iterable
+
+import srt
+
+# Whisper считает прогресс в кадрах mel-спектрограммы: 100 кадров на секунду аудио
+_FRAMES_PER_SECOND = 100
+
+_local = threading.local()
+_hook_lock = threading.Lock()
+_hook_installed = False
+
+
+class _TqdmShim:
+    """Подменяет tqdm внутри whisper.transcribe и передаёт прогресс декодирования колбэку потока"""
+
+    def __init__(self, *args, **kwargs):
+        self.n = 0
+        self._callback = getattr(_local, "callback", None)
+
+    def update(self, n=1):
+        self.n += n
+        if self._callback:
+            self._callback(self.n / _FRAMES_PER_SECOND)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _TqdmModule:
+    tqdm = _TqdmShim
+
+
+def install_whisper_progress_hook():
+    """Один раз заменяет tqdm в модуле whisper.transcribe; колбэки хранятся отдельно для каждого потока"""
+    global _hook_installed
+    with _hook_lock:
+        if _hook_installed:
+            return
+        module = importlib.import_module("whisper.transcribe")
+        module.tqdm = _TqdmModule
+        _hook_installed = True
+
+
+@contextmanager
+def whisper_progress(callback: Callable[[float], None]):
+    """Внутри блока transcribe() текущего потока сообщает, сколько секунд аудио уже декодировано"""
+    previous = getattr(_local, "callback", None)
+    _local.callback = callback
+    try:
+        yield
+    finally:
+        _local.callback = previous
+
+
+def format_eta(seconds: float) -> str:
+    seconds = int(max(0, seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class ProgressTracker:
+    """Переводит декодированное время в проценты, ETA и коэффициент скорости (x реального времени).
+
+    Сигналы отправляются не чаще раза в min_interval секунд, чтобы не заваливать цикл событий Qt.
+    """
+
+    def __init__(self, total_sec: float, emit: Callable[[int, float, float], None],
+                 start_pct: int = 30, end_pct: int = 70, min_interval: float = 0.5, done_sec: float = 0.0):
+        self.total_sec = max(total_sec, 1e-6)
+        self._emit = emit
+        self.start_pct = start_pct
+        self.end_pct = end_pct
+        self.min_interval = min_interval
+        # Уже готовая часть (например, из чекпоинта) не участвует в расчёте скорости
+        self._base_sec = done_sec
+        self._started = time.monotonic()
+        self._last_emit = 0.0
+        self._last_pct = -1
+
+    def update(self, decoded_sec: float, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_emit < self.min_interval:
+            return
+        decoded_sec = min(decoded_sec, self.total_sec)
+        pct = self.start_pct + int((self.end_pct - self.start_pct) * decoded_sec / self.total_sec)
+        elapsed = now - self._started
+        processed = decoded_sec - self._base_sec
+        # Первую секунду скорость не оцениваем: слишком мало данных, ETA прыгает
+        speed = processed / elapsed if elapsed >= 1.0 and processed > 0 else 0.0
+        eta = (self.total_sec - decoded_sec) / speed if speed > 0 else -1.0
+        if not force and pct == self._last_pct and speed == 0.0:
+            return
+        self._last_emit = now
+        self._last_pct = pct
+        self._emit(pct, eta, speed)
+
+
+class PartialSrtWriter:
+    """Дописывает субтитры в <имя>.partial.srt по мере появления, чтобы файл можно было открыть до конца задачи"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._index = 0
+        self.path.write_text("", encoding='utf-8')
+
+    def append(self, items: Iterable[tuple]):
+        """items — кортежи (начало, конец, текст) в секундах исходной записи"""
+        subtitles = []
+        for start, end, text in items:
+            self._index += 1
+            subtitles.append(srt.Subtitle(index=self._index, start=timedelta(seconds=start),
+                                          end=timedelta(seconds=end), content=text.strip()))
+        if not subtitles:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(srt.compose(subtitles, reindex=False))
+            f.flush()
+
+    def rewrite(self, items: Iterable[tuple]):
+        """Заменяет файл целиком, например когда коррекция поменяла текст уже записанных субтитров"""
+        subtitles = [srt.Subtitle(index=i, start=timedelta(seconds=start), end=timedelta(seconds=end),
+                                  content=text.strip())
+                     for i, (start, end, text) in enumerate(items, 1)]
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(srt.compose(subtitles, reindex=False))
+        os.replace(tmp_path, self.path)
+        self._index = len(subtitles)
+
+    def remove(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
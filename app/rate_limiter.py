@@ -0,0 +1,76 @@
+import threading
+import time
+from typing import Dict, Tuple
+
+
+class TokenBucket:
+    """Ограничение частоты запросов: rate запросов в секунду в среднем, до burst подряд без ожидания.
+
+    acquire() резервирует токен под блокировкой и ждёт вне её, поэтому потоки обслуживаются
+    в порядке обращения и общий темп не превышает rate. rate <= 0 — без ограничения.
+    """
+
+    def __init__(self, rate: float = 0.0, burst: int = 1):
+        self._lock = threading.Lock()
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self.requests = 0
+        self.waited = 0.0
+
+    def configure(self, rate: float, burst: int):
+        with self._lock:
+            self.rate = rate
+            self.burst = max(1, burst)
+            self._tokens = min(self._tokens, float(self.burst))
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Ждёт своей очереди; возвращает время ожидания в секундах"""
+        with self._lock:
+            self.requests += 1
+            if self.rate <= 0:
+                return 0.0
+            now = time.monotonic()
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited += wait
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def stats_summary(self) -> str:
+        with self._lock:
+            limit = f"{self.rate:g} запр/с, пачка {self.burst}" if self.rate > 0 else "без ограничения"
+            return f"запросов {self.requests}, ожидание {self.waited:.1f} с ({limit})"
+
+
+# Общие на процесс ограничители по имени провайдера: "translate" — офлайн-переводчик, "g4f" — запросы к g4f
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get(name: str) -> TokenBucket:
+    with _buckets_lock:
+        if name not in _buckets:
+            _buckets[name] = TokenBucket()
+        return _buckets[name]
+
+
+def configure(name: str, rate: float, burst: int) -> TokenBucket:
+    """Меняет лимит существующего ограничителя, не сбрасывая его у тех, кто уже его держит"""
+    bucket = get(name)
+    bucket.configure(rate, burst)
+    return bucket
+
+
+def configure_from(config) -> Tuple[TokenBucket, TokenBucket]:
+    return (configure("translate", float(config.get("translate_rate_limit_rps")),
+                      int(config.get("translate_rate_limit_burst"))),
+            configure("g4f", float(config.get("g4f_rate_limit_rps")), int(config.get("g4f_rate_limit_burst"))))
+
+
+def acquire(name: str, tokens: float = 1.0) -> float:
+    return get(name).acquire(tokens)
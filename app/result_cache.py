@@ -0,0 +1,47 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from .disk_cache import SizeBoundedCache
+
+# Меняется при изменении формата записей или логики транскрибации
+CACHE_VERSION = 1
+
+
+class ResultCache(SizeBoundedCache):
+    """Дисковый кэш сырых сегментов Whisper, адресуемый по содержимому медиа и параметрам.
+
+    Каждая запись — отдельный JSON-файл <ключ>.json.
+    """
+
+    pattern = "*.json"
+
+    def __init__(self, cache_dir: Path, max_mb: float = 512):
+        super().__init__(cache_dir, max_mb)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if data.get("version") != CACHE_VERSION:
+            return None
+        self._touch(path)
+        return data.get("segments", [])
+
+    def put(self, key: str, segments: List[dict], meta: Optional[dict] = None):
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        data = {"version": CACHE_VERSION, "created": time.time(), "meta": meta or {}, "segments": segments}
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._evict()
@@ -0,0 +1,108 @@
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from queue import Queue
+from typing import Callable, Optional
+
+from .audio import media_duration
+
+POLICIES = ("fifo", "shortest", "priority", "deadline")
+
+# Относительная стоимость секунды записи для моделей Whisper (tiny = 1)
+MODEL_COST = {
+    "tiny": 1.0,
+    "base": 1.7,
+    "small": 4.0,
+    "medium": 9.0,
+    "large": 18.0,
+}
+# OCR читает кадры раз в полсекунды, секунда видео стоит примерно как base
+OCR_COST = 1.7
+
+
+def estimate_cost(task) -> Optional[float]:
+    """Оценка стоимости задачи: длительность × модель × режим; None, пока длительность неизвестна"""
+    if task.duration_sec is None:
+        return None
+    factor = OCR_COST if task.use_ocr_mode else MODEL_COST.get(task.model_size, MODEL_COST["base"])
+    return task.duration_sec * factor
+
+
+def sort_key(task, seq: int, policy: str) -> tuple:
+    """Ключ сортировки очереди: меньше — раньше. seq — порядок добавления, решает при равенстве"""
+    unknown = float("inf")
+    if policy == "shortest":
+        cost = task.cost if task.cost is not None else unknown
+        return (-task.priority, cost, seq)
+    if policy == "priority":
+        return (-task.priority, seq)
+    if policy == "deadline":
+        deadline = task.deadline if task.deadline is not None else unknown
+        cost = task.cost if task.cost is not None else unknown
+        return (-task.priority, deadline, cost, seq)
+    return (seq,)
+
+
+def order_by_sql(policy: str) -> str:
+    """Тот же порядок для выборки из JobStore"""
+    if policy == "shortest":
+        return "priority DESC, cost IS NULL, cost, id"
+    if policy == "priority":
+        return "priority DESC, id"
+    if policy == "deadline":
+        return "priority DESC, deadline IS NULL, deadline, cost IS NULL, cost, id"
+    return "id"
+
+
+class ScheduledQueue(Queue):
+    """queue.Queue, который отдаёт задачи по политике планировщика, а не по порядку добавления.
+
+    Политику и приоритеты можно менять на ходу: порядок вычисляется при каждом get().
+    Интерфейс прежний (put/get/task_done, queue.clear() под mutex), поэтому add_task
+    воркеров не меняется.
+    """
+
+    def __init__(self, policy: str = "fifo"):
+        self.policy = policy
+        super().__init__()
+
+    def _init(self, maxsize):
+        self.queue = []
+        self._seq = itertools.count()
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, item):
+        self.queue.append((next(self._seq), item))
+
+    def _get(self):
+        entry = min(self.queue, key=lambda e: sort_key(e[1], e[0], self.policy))
+        self.queue.remove(entry)
+        return entry[1]
+
+    def set_priority(self, task_id: str, priority: int) -> bool:
+        with self.mutex:
+            for _, task in self.queue:
+                if task.task_id == task_id:
+                    task.priority = priority
+                    return True
+        return False
+
+
+class DurationProber:
+    """Узнаёт длительность файлов в фоновых потоках, чтобы не задерживать интерфейс при добавлении"""
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="duration-probe")
+
+    def submit(self, task_id: str, path: Path, callback: Callable[[str, float], None]):
+        """callback(task_id, длительность) вызывается в потоке пула; -1 — длительность неизвестна"""
+        def probe():
+            duration = media_duration(path)
+            callback(task_id, duration if duration is not None else -1.0)
+        self._executor.submit(probe)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
@@ -0,0 +1,106 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+
+class SqliteLruCache:
+    """Таблица «ключ → текст» в SQLite, размер которой ограничен max_mb.
+
+    Время последнего обращения хранится в столбце last_used с индексом; при превышении лимита
+    первыми удаляются записи, к которым дольше всего не обращались (LRU). Перед key могут идти
+    столбцы scope (например, пара языков): записи ищутся внутри одного значения scope.
+    Интерфейс stats()/clear()/cache_dir/max_bytes совпадает с SizeBoundedCache для окна «Кэш».
+    """
+
+    filename = ""
+    table = ""
+    scope = ()
+    title = ""
+
+    def __init__(self, cache_dir: Path, max_mb: float):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.cache_dir / self.filename, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = "".join(f"{column} TEXT NOT NULL, " for column in self.scope)
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                           f"{columns}key TEXT NOT NULL, text TEXT NOT NULL, size INTEGER NOT NULL, "
+                           f"last_used REAL NOT NULL, PRIMARY KEY ({', '.join((*self.scope, 'key'))})) "
+                           f"WITHOUT ROWID")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_lru ON {self.table} (last_used)")
+        self._conn.commit()
+        self._total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        self._match = "".join(f"{column} = ? AND " for column in self.scope)
+        self.hits = 0
+        self.misses = 0
+
+    def _select(self, column: str, scope: tuple, keys: list) -> dict:
+        # SQLite ограничивает число параметров запроса, поэтому читаем порциями
+        found = {}
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            found.update(self._conn.execute(
+                f"SELECT key, {column} FROM {self.table} WHERE {self._match}key IN ({', '.join('?' * len(part))})",
+                [*scope, *part]).fetchall())
+        return found
+
+    def _get_many(self, scope: tuple, keys: Iterable[str]) -> Dict[str, str]:
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            found = self._select("text", scope, keys)
+            if found:
+                now = time.time()
+                self._conn.executemany(f"UPDATE {self.table} SET last_used = ? WHERE {self._match}key = ?",
+                                       [(now, *scope, key) for key in found])
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def _put_many(self, scope: tuple, items: Dict[str, str]):
+        now = time.time()
+        rows = [(*scope, key, text, len(key) + len(text.encode("utf-8")), now) for key, text in items.items()]
+        if not rows:
+            return
+        with self._lock:
+            existing = self._select("size", scope, list(items))
+            columns = (*self.scope, "key", "text", "size", "last_used")
+            self._conn.executemany(f"INSERT OR REPLACE INTO {self.table} ({', '.join(columns)}) "
+                                   f"VALUES ({', '.join('?' * len(columns))})", rows)
+            self._total += sum(row[-2] for row in rows) - sum(existing.values())
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Вызывается под self._lock; удаляем порциями самые давние записи
+        columns = (*self.scope, "key")
+        while self._total > self.max_bytes:
+            victims = self._conn.execute(
+                f"SELECT {', '.join(columns)}, size FROM {self.table} ORDER BY last_used LIMIT 256").fetchall()
+            if not victims:
+                self._total = 0
+                return
+            self._conn.executemany(f"DELETE FROM {self.table} WHERE {' AND '.join(f'{c} = ?' for c in columns)}",
+                                   [victim[:-1] for victim in victims])
+            self._total -= sum(victim[-1] for victim in victims)
+
+    def stats(self) -> Tuple[int, int]:
+        """Число записей и их суммарный размер в байтах"""
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+            self._total = 0
+
+    def stats_summary(self) -> str:
+        requests = self.hits + self.misses
+        hit_rate = self.hits / requests * 100 if requests else 0.0
+        return f"{self.title}: попаданий {self.hits}, промахов {self.misses} ({hit_rate:.0f}%)"
@@ -0,0 +1,84 @@
+import os
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional
+
+import srt
+
+
+def iter_subtitles(path: Path, on_bytes: Optional[Callable[[int], None]] = None) -> Iterator[srt.Subtitle]:
+    """Лениво читает SRT по блокам: в памяти только текущий субтитр.
+
+    Пустая строка завершает блок, только если за ней идёт номер следующего субтитра, а за
+    номером — строка времени с «-->»; пустые строки и числа внутри текста остаются в нём,
+    как при srt.parse всего файла. on_bytes(n) получает размер каждой прочитанной строки
+    в байтах — для прогресса.
+    """
+    block: List[str] = []
+    gap: List[str] = []
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        line = f.readline()
+        while line:
+            # Строка после текущей нужна, чтобы отличить номер субтитра от числа в тексте
+            following = f.readline()
+            if on_bytes:
+                on_bytes(len(line.encode('utf-8')))
+            if not line.strip():
+                gap.append(line)
+            else:
+                if gap:
+                    if block and line.strip().isdigit() and "-->" in following:
+                        yield from srt.parse("".join(block))
+                        block = []
+                    elif block:
+                        block.extend(gap)
+                    gap = []
+                block.append(line)
+            line = following
+    if block:
+        yield from srt.parse("".join(block))
+
+
+def windows(items: Iterable, size: int) -> Iterator[list]:
+    """Последовательные окна по size элементов"""
+    iterator = iter(items)
+    while True:
+        window = list(islice(iterator, size))
+        if not window:
+            return
+        yield window
+
+
+class SrtStreamWriter:
+    """Дописывает субтитры в <имя>.partial.srt и при успешном завершении переименовывает его в итоговый файл.
+
+    После каждого окна файл сброшен на диск, так что при прерывании .partial.srt остаётся
+    корректным SRT с уже переведённой частью. Пустые субтитры пропускаются, как в srt.compose.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.partial_path = self.path.with_name(f"{self.path.stem}.partial{self.path.suffix}")
+        self._index = 0
+        self._file = None
+
+    def __enter__(self) -> "SrtStreamWriter":
+        self._file = open(self.partial_path, 'w', encoding='utf-8')
+        return self
+
+    def write(self, subtitles: Iterable[srt.Subtitle]):
+        kept = []
+        for sub in subtitles:
+            if not sub.content.strip():
+                continue
+            self._index += 1
+            kept.append(srt.Subtitle(self._index, sub.start, sub.end, sub.content, sub.proprietary))
+        if kept:
+            self._file.write(srt.compose(kept, reindex=False))
+            self._file.flush()
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+        if exc_type is None:
+            os.replace(self.partial_path, self.path)
+        return False
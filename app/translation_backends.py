@@ -0,0 +1,199 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from . import rate_limiter
+
+Log = Callable[[str, str], None]
+
+
+class TranslationBackend:
+    """Сервис перевода строк субтитров.
+
+    Каждый бэкенд объявляет, сколько строк отправлять за раз (batch_size), сколько батчей
+    переводить одновременно (concurrency) и через какой общий ограничитель rate_limiter
+    идут его запросы (limiter; лимиты задаются в конфиге). concurrency действует на весь
+    экземпляр: сколько бы вызовов translate_lines ни шло параллельно (например, по языкам),
+    в полёте не больше concurrency батчей. translate_batch возвращает список той же длины,
+    None — строку перевести не удалось. check_language отклоняет неподдерживаемый язык
+    до начала перевода.
+    """
+
+    name = ""
+    batch_size = 15
+    concurrency = 1
+    limiter = ""
+
+    def __init__(self, batch_size: Optional[int] = None, concurrency: Optional[int] = None,
+                 log: Optional[Log] = None):
+        if batch_size:
+            self.batch_size = batch_size
+        if concurrency:
+            self.concurrency = concurrency
+        self.log = log or (lambda level, message: None)
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+
+    def check_language(self, target_lang: str):
+        """ValueError, если на этот язык бэкенд переводить не умеет"""
+
+    def translate_batch(self, lines: List[str], target_lang: str, source_lang: str) -> List[Optional[str]]:
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        limit = f", лимит «{self.limiter}»" if self.limiter else ""
+        return f"{self.name}: батч {self.batch_size}, параллельно {self.concurrency}{limit}"
+
+
+class OfflineBackend(TranslationBackend):
+    """Библиотека translate: один запрос на строку, лимит «translate»"""
+
+    name = "offline"
+    batch_size = 15
+    concurrency = 1
+    limiter = "translate"
+    _LANGS = {"en": "EN", "de": "DE", "fr": "FR", "es": "ES", "it": "IT", "uk": "UK", "pl": "PL"}
+
+    def __init__(self, batch_size: Optional[int] = None, concurrency: Optional[int] = None,
+                 log: Optional[Log] = None):
+        super().__init__(batch_size, concurrency, log)
+        self._translators = {}
+        self._lock = threading.Lock()
+
+    def check_language(self, target_lang: str):
+        if target_lang not in self._LANGS:
+            raise ValueError(f"Офлайн-перевод на '{target_lang}' не поддерживается "
+                             f"(доступны: {', '.join(self._LANGS)})")
+
+    def _get_translator(self, target_lang: str, source_lang: str = "auto"):
+        """Получаем или создаем переводчик для языка"""
+        self.check_language(target_lang)
+        target_lang = self._LANGS[target_lang]
+        # auto — сервис сам определяет исходный язык
+        source_lang = "autodetect" if source_lang in ("", "auto") else source_lang.upper()
+        cache_key = f"{source_lang}|{target_lang}"
+        with self._lock:
+            if cache_key not in self._translators:
+                try:
+                    # Офлайн библиотека перевода импортируется только при первом переводе
+                    from translate import Translator
+                    self._translators[cache_key] = Translator(to_lang=target_lang, from_lang=source_lang)
+                    self.log("info", f"Создан переводчик: {source_lang} -> {target_lang}")
+                except Exception as e:
+                    self.log("error", f"Ошибка создания переводчика: {e}")
+                    raise
+            return self._translators[cache_key]
+
+    def translate_batch(self, lines: List[str], target_lang: str, source_lang: str) -> List[Optional[str]]:
+        translator = self._get_translator(target_lang, source_lang)
+        result = []
+        for i, text in enumerate(lines):
+            try:
+                rate_limiter.acquire(self.limiter)
+                result.append(translator.translate(text))
+            except Exception as e:
+                self.log("warning", f"Ошибка перевода строки {i + 1}: {e}")
+                result.append(None)
+        return result
+
+
+class G4FBackend(TranslationBackend):
+    """g4f_translate_lines: батч строк в одном запросе, повтор половинами при неверном числе строк.
+
+    Лимит «g4f» соблюдает общий пул g4f_client на каждом запросе, включая повторы.
+    Ответ читается целиком, без on_line: перевод попадает в файл окнами SrtStreamWriter
+    только после сверки числа строк, так что предварительным строкам некуда идти.
+    """
+
+    name = "g4f"
+    batch_size = 40
+    concurrency = 4
+    limiter = "g4f"
+
+    def __init__(self, model: str = "gpt-4o-mini", batch_size: Optional[int] = None,
+                 concurrency: Optional[int] = None, log: Optional[Log] = None):
+        super().__init__(batch_size, concurrency, log)
+        self.model = model
+
+    def translate_batch(self, lines: List[str], target_lang: str, source_lang: str) -> List[Optional[str]]:
+        from .g4f_client import g4f_translate_lines
+        try:
+            return g4f_translate_lines(lines, self.model, target_lang, source_lang)
+        except Exception as e:
+            self.log("warning", f"Перевод батча через g4f не удался, строки оставлены как есть: {e}")
+            return [None] * len(lines)
+
+
+class StubBackend(TranslationBackend):
+    """Детерминированный локальный перевод "[<язык>] <строка>" без сети — для проверок и бенчмарков"""
+
+    name = "stub"
+    batch_size = 50
+    concurrency = 4
+
+    def __init__(self, latency: float = 0.0, batch_size: Optional[int] = None,
+                 concurrency: Optional[int] = None, log: Optional[Log] = None):
+        super().__init__(batch_size, concurrency, log)
+        self.latency = latency
+
+    def translate_batch(self, lines: List[str], target_lang: str, source_lang: str) -> List[Optional[str]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [f"[{target_lang}] {line}" for line in lines]
+
+
+BACKENDS: Dict[str, type] = {backend.name: backend for backend in (OfflineBackend, G4FBackend, StubBackend)}
+
+
+def backend_name(configured: str, use_g4f: bool) -> str:
+    """configured — ключ translation_backend из конфига; auto выбирает по флагу use_g4f задачи"""
+    if configured and configured != "auto":
+        return configured
+    return "g4f" if use_g4f else "offline"
+
+
+def create_backend(name: str, model: str = "", concurrency: Optional[int] = None,
+                   log: Optional[Log] = None) -> TranslationBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд перевода: {name}")
+    if name == "g4f":
+        return G4FBackend(model or "gpt-4o-mini", concurrency=concurrency, log=log)
+    return BACKENDS[name](log=log)
+
+
+def translate_lines(backend: TranslationBackend, lines: List[str], target_lang: str, source_lang: str,
+                    on_batch_done: Optional[Callable[[int, int], None]] = None) -> List[Optional[str]]:
+    """Перевод батчами backend.batch_size, не больше backend.concurrency батчей одновременно
+    на весь бэкенд, включая параллельные вызовы; порядок строк сохраняется.
+
+    Неподдерживаемый язык или ни одной переведённой строки — RuntimeError/ValueError, чтобы
+    задача упала, а не записала исходный текст как перевод.
+    """
+    backend.check_language(target_lang)
+    batches = [list(range(i, min(i + backend.batch_size, len(lines)))) for i in range(0, len(lines), backend.batch_size)]
+    result: List[Optional[str]] = [None] * len(lines)
+    if not batches:
+        return result
+
+    def run(batch: List[int]) -> List[Optional[str]]:
+        with backend._slots:
+            return backend.translate_batch([lines[i] for i in batch], target_lang, source_lang)
+
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(1, min(backend.concurrency, len(batches))),
+                            thread_name_prefix=f"translate-{backend.name}") as pool:
+        futures = {pool.submit(run, batch): batch for batch in batches}
+        for done, future in enumerate(as_completed(futures), 1):
+            batch = futures[future]
+            try:
+                for i, text in zip(batch, future.result()):
+                    result[i] = text
+            except Exception as e:
+                errors.append(e)
+                backend.log("warning", f"Ошибка перевода батча: {e}")
+            if on_batch_done:
+                on_batch_done(done, len(batches))
+    if all(text is None for text in result):
+        reason = f": {errors[0]}" if errors else ""
+        raise RuntimeError(f"{backend.name}: не переведено ни одной строки на '{target_lang}'{reason}")
+    return result
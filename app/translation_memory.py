@@ -0,0 +1,36 @@
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+from .hashing import normalize_line
+from .sqlite_cache import SqliteLruCache
+
+
+def line_hash(text: str) -> str:
+    return hashlib.blake2b(normalize_line(text).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class TranslationMemory(SqliteLruCache):
+    """Память переводов в SQLite: ключ — исходный язык, язык перевода и хеш нормализованной строки.
+
+    Повторяющиеся строки и повторный перевод файла обслуживаются локально; поиск и запись идут
+    по первичному ключу, поэтому скорость не зависит от числа записей. Лежит в той же папке
+    translation_cache. Старые файлы auto_en_<md5>.json не читаются и не удаляются: в них только
+    переведённые строки без исходных, сопоставить их со строками нельзя.
+    """
+
+    filename = "translations.sqlite3"
+    table = "translations"
+    scope = ("src", "tgt")
+    title = "Память переводов"
+
+    def __init__(self, cache_dir: Path, max_mb: float = 256):
+        super().__init__(cache_dir, max_mb)
+
+    def get_many(self, src: str, tgt: str, lines: Iterable[str]) -> Dict[str, str]:
+        """Найденные переводы: {хеш строки: перевод}"""
+        return self._get_many((src, tgt), (line_hash(line) for line in lines))
+
+    def put_many(self, src: str, tgt: str, items: Iterable[Tuple[str, str]]):
+        """items — пары (исходная строка, перевод)"""
+        self._put_many((src, tgt), {line_hash(line): text for line, text in items})
@@ -1,21 +1,28 @@
-import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from queue import Queue, Empty
+from typing import Dict, List, Optional, Tuple
 
 from PyQt6.QtCore import QThread, pyqtSignal
 import srt
 
-# Импортируем офлайн библиотеку для перевода
-from translate import Translator
+from . import rate_limiter
+from .job_store import JobStore, params_to_kwargs
+from .srt_stream import SrtStreamWriter, iter_subtitles, windows
+from .translation_backends import TranslationBackend, backend_name, create_backend, translate_lines
+from .translation_memory import TranslationMemory, line_hash
 
 
 class TranslationTask(tuple):
     __slots__ = ()
-    _fields = ('task_id', 'source_path', 'target_lang', 'use_g4f', 'g4f_model', 'source_lang')
+    _fields = ('task_id', 'source_path', 'target_lang', 'use_g4f', 'g4f_model', 'source_lang', 'target_langs')
 
     def __new__(cls, task_id: str, source_path: Path, target_lang: str, use_g4f: bool, g4f_model: str,
-                source_lang: str = "auto"):
-        return tuple.__new__(cls, (task_id, source_path, target_lang, use_g4f, g4f_model, source_lang))
+                source_lang: str = "auto", target_langs: Tuple[str, ...] = ()):
+        return tuple.__new__(cls, (task_id, source_path, target_lang, use_g4f, g4f_model, source_lang,
+                                   tuple(target_langs)))
 
     @property
     def task_id(self): return self[0]
@@ -35,120 +42,164 @@ class TranslationTask(tuple):
     @property
     def source_lang(self): return self[5]
 
+    @property
+    def target_langs(self): return self[6]
+
+    @property
+    def languages(self) -> Tuple[str, ...]:
+        """Все языки задания: target_langs для перевода сразу на несколько языков, иначе target_lang"""
+        return self.target_langs or (self.target_lang,)
+
+
+# Сколько последних переводов потоковый перевод SRT держит в памяти для повторяющихся строк
+RECENT_TRANSLATIONS = 20000
+
 
 class TranslationWorker(QThread):
     translation_completed = pyqtSignal(str, str)
     translation_failed = pyqtSignal(str, str)
+    # Перевод на несколько языков: task_id, язык, прогресс в процентах / путь к файлу / текст ошибки
+    language_progress = pyqtSignal(str, str, int)
+    language_completed = pyqtSignal(str, str, str)
+    language_failed = pyqtSignal(str, str, str)
     log_message = pyqtSignal(str, str)
+    job_kind = "translation"
 
-    def __init__(self):
+    def __init__(self, job_store: Optional[JobStore] = None, memory: Optional[TranslationMemory] = None,
+                 max_languages: int = 3, backend: str = "auto", g4f_concurrency: Optional[int] = None,
+                 window_lines: int = 500):
         super().__init__()
         self.tasks_queue = Queue()
+        self.job_store = job_store
+        self.memory = memory
+        self.max_languages = max(1, max_languages)
+        # auto — offline или g4f по флагу use_g4f задачи; иначе имя из translation_backends.BACKENDS
+        self.backend = backend
+        self.g4f_concurrency = g4f_concurrency
+        self.window_lines = max(1, window_lines)
+        self._backends = {}
+        self._backends_lock = threading.Lock()
         self._is_running = True
-        self.translator_cache = {}
 
     def add_task(self, task: TranslationTask):
-        self.tasks_queue.put(task)
-
-    def _get_translator(self, target_lang: str, source_lang: str = "auto"):
-        """Получаем или создаем переводчик для языка"""
-        lang_dict = {"en" : "EN", "de" : "DE", "fr" : "FR" , "es" : "ES","it": "IT", "uk":"UK" , "pl" : "PL"}
-        source_lang = "RU"
-        print(lang_dict[target_lang])
-        new_lang = lang_dict[target_lang]
-        target_lang = new_lang
-        print("Исходный язык - ", source_lang)
-        print("Язык перевода - ", target_lang)
-        cache_key = f"{source_lang}|{target_lang}"
-        if cache_key not in self.translator_cache:
-            try:
-                # Создаем переводчик для офлайн работы
-                translator = Translator(
-                    to_lang=target_lang,
-                    from_lang=source_lang if source_lang != "auto" else None
-                )
-                self.translator_cache[cache_key] = translator
-                self.log_message.emit("info", f"Создан переводчик: {source_lang} -> {target_lang}")
-            except Exception as e:
-                self.log_message.emit("error", f"Ошибка создания переводчика: {e}")
-                raise
-        return self.translator_cache[cache_key]
-
-    def _batch_translate_offline(self, texts: list, target_lang: str, source_lang: str = "auto") -> list:
-        """Офлайн перевод батча текстов"""
+        if self.job_store is not None:
+            self.job_store.save(self.job_kind, task, state="queued")
+        else:
+            self.tasks_queue.put(task)
+
+    def _backend(self, task: TranslationTask) -> TranslationBackend:
+        """Бэкенд перевода задачи: из конфига или по флагу use_g4f; создаётся один раз на имя и модель"""
+        name = backend_name(self.backend, task.use_g4f)
+        key = (name, task.g4f_model if name == "g4f" else "")
+        with self._backends_lock:
+            if key not in self._backends:
+                self._backends[key] = create_backend(name, model=task.g4f_model, concurrency=self.g4f_concurrency,
+                                                     log=self.log_message.emit)
+            return self._backends[key]
+
+    def _translate_texts(self, backend: TranslationBackend, texts: list, target_lang: str, source_lang: str,
+                         on_progress=None) -> list:
+        """Перевод строк через бэкенд; строки из памяти переводов в сервис не отправляются.
+        Непереведённые строки возвращаются как есть и в память не попадают."""
         if not texts:
             return []
 
-        translator = self._get_translator(target_lang, source_lang)
-        translated_texts = []
-
-        for i, text in enumerate(texts):
-            try:
-                if not text.strip():
-                    translated_texts.append("")
-                    continue
+        remembered = self.memory.get_many(source_lang, target_lang, texts) if self.memory is not None else {}
+        keys = [line_hash(text) if text.strip() else None for text in texts]
+        misses = [i for i, key in enumerate(keys) if key is not None and key not in remembered]
 
-                # Переводим текст
-                translated = translator.translate(text)
-                translated_texts.append(translated)
+        def on_batch_done(done: int, total: int):
+            self.log_message.emit("info", f"Перевод батча {done}/{total} на '{target_lang}'")
+            if on_progress:
+                on_progress(done, total)
 
-                # Логируем прогресс для больших батчей
-                if len(texts) > 10 and i % 10 == 0:
-                    self.log_message.emit("info", f"Переведено {i + 1}/{len(texts)} строк")
-
-                # Небольшая задержка чтобы не перегружать систему
-                time.sleep(0.05)
-
-            except Exception as e:
-                self.log_message.emit("warning", f"Ошибка перевода строки {i + 1}: {e}")
+        translated = translate_lines(backend, [texts[i] for i in misses], target_lang, source_lang, on_batch_done)
+        result = [remembered.get(key, "") if key is not None else "" for key in keys]
+        learned = []
+        for i, text in zip(misses, translated):
+            if text is None:
                 # В случае ошибки возвращаем оригинальный текст
-                translated_texts.append(text)
-
-        return translated_texts
-
-    def _translate_srt_offline(self, source_path: Path, target_lang: str, source_lang: str) -> Path:
-        """Офлайн перевод SRT файла"""
-        with open(source_path, 'r', encoding='utf-8') as f:
-            subs = list(srt.parse(f.read()))
-
-        contents = [s.content for s in subs]
-
-        # Разбиваем на батчи для стабильности
-        batch_size = 15
-        translated = []
-
-        for i in range(0, len(contents), batch_size):
-            chunk = contents[i:i + batch_size]
-            self.log_message.emit("info",
-                                  f"Перевод батча {i // batch_size + 1}/{(len(contents) - 1) // batch_size + 1}")
-
-            out = self._batch_translate_offline(chunk, target_lang, source_lang)
-            translated.extend(out)
-
-        # Обновляем субтитры переведенным текстом
-        for s, t in zip(subs, translated):
-            s.content = t
-
+                result[i] = texts[i]
+            else:
+                result[i] = text
+                learned.append((texts[i], text))
+
+        if self.memory is not None and learned:
+            self.memory.put_many(source_lang, target_lang, learned)
+        return result
+
+    def _unique_lines(self, texts: list) -> Tuple[List[str], Dict[str, str]]:
+        """Хеши строк по порядку и первое вхождение каждой уникальной (после нормализации) строки"""
+        keys = [line_hash(text) for text in texts]
+        unique = {}
+        for key, text in zip(keys, texts):
+            unique.setdefault(key, text)
+        if texts:
+            self.log_message.emit("info", f"Строк {len(texts)}, уникальных {len(unique)} "
+                                          f"(повторы: {1 - len(unique) / len(texts):.0%})")
+        return keys, unique
+
+    def _translate_keys(self, backend: TranslationBackend, unique: Dict[str, str], target_lang: str,
+                        source_lang: str, on_progress=None) -> Dict[str, str]:
+        unique_keys = list(unique)
+        out = self._translate_texts(backend, [unique[key] for key in unique_keys], target_lang, source_lang,
+                                    on_progress)
+        return dict(zip(unique_keys, out))
+
+    def _translate_unique(self, backend: TranslationBackend, texts: list, target_lang: str, source_lang: str) -> list:
+        """Переводит каждую уникальную строку один раз и раскладывает перевод по всем повторам"""
+        keys, unique = self._unique_lines(texts)
+        translations = self._translate_keys(backend, unique, target_lang, source_lang)
+        return [translations[key] for key in keys]
+
+    def _translate_srt(self, backend: TranslationBackend, source_path: Path, target_lang: str,
+                       source_lang: str, on_progress=None) -> Path:
+        """Потоковый перевод SRT: субтитры читаются лениво, переводятся окнами по window_lines и
+        сразу дописываются в <имя>_<язык>.partial.srt, который в конце становится <имя>_<язык>.srt.
+        Память не растёт с размером файла; повторы берутся из последних RECENT_TRANSLATIONS переводов."""
         output_path = source_path.with_name(f"{source_path.stem}_{target_lang}.srt")
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(srt.compose(subs))
-
+        total_bytes = max(1, source_path.stat().st_size)
+        progress = {"read": 0, "lines": 0, "sent": 0}
+        recent = OrderedDict()
+
+        def on_bytes(size: int):
+            progress["read"] += size
+
+        with SrtStreamWriter(output_path) as writer:
+            for window in windows(iter_subtitles(source_path, on_bytes), self.window_lines):
+                keys = [line_hash(s.content) for s in window]
+                known = {key: recent[key] for key in keys if key in recent}
+                unique = {}
+                for key, s in zip(keys, window):
+                    if key not in known:
+                        unique.setdefault(key, s.content)
+                known.update(self._translate_keys(backend, unique, target_lang, source_lang))
+                writer.write(srt.Subtitle(s.index, s.start, s.end, known[key], s.proprietary)
+                             for s, key in zip(window, keys))
+
+                for key, text in known.items():
+                    recent[key] = text
+                    recent.move_to_end(key)
+                while len(recent) > RECENT_TRANSLATIONS:
+                    recent.popitem(last=False)
+                progress["lines"] += len(window)
+                progress["sent"] += len(unique)
+                self.log_message.emit("info", f"Переведено субтитров: {progress['lines']} на '{target_lang}'")
+                if on_progress:
+                    on_progress(min(99, 100 * progress["read"] // total_bytes))
+
+        if progress["lines"]:
+            self.log_message.emit("info", f"Строк {progress['lines']}, отправлено на перевод {progress['sent']} "
+                                          f"(повторы: {1 - progress['sent'] / progress['lines']:.0%})")
         return output_path
 
-    def _translate_txt_offline(self, source_path: Path, target_lang: str, source_lang: str) -> Path:
-        """Офлайн перевод TXT файла"""
+    def _translate_txt(self, backend: TranslationBackend, source_path: Path, target_lang: str,
+                       source_lang: str) -> Path:
+        """Перевод TXT файла"""
         with open(source_path, 'r', encoding='utf-8') as f:
             lines = [ln.strip() for ln in f.readlines() if ln.strip()]
 
-        batch_size = 20
-        translated = []
-
-        for i in range(0, len(lines), batch_size):
-            chunk = lines[i:i + batch_size]
-            self.log_message.emit("info", f"Перевод батча {i // batch_size + 1}/{(len(lines) - 1) // batch_size + 1}")
-
-            out = self._batch_translate_offline(chunk, target_lang, source_lang)
-            translated.extend(out)
+        translated = self._translate_unique(backend, lines, target_lang, source_lang)
 
         output_path = source_path.with_name(f"{source_path.stem}_{target_lang}.txt")
         with open(output_path, 'w', encoding='utf-8') as f:
@@ -156,29 +207,140 @@ class TranslationWorker(QThread):
 
         return output_path
 
+    def _translate_languages(self, task: TranslationTask) -> Tuple[List[Path], Dict[str, str]]:
+        """Перевод на несколько языков: исходник разбирается один раз, языки переводятся параллельно
+        (не больше max_languages), файл <имя>_<язык> пишется, как только готов его язык.
+        Все языки идут через один экземпляр бэкенда, поэтому запросов в полёте не больше его
+        concurrency, а не max_languages × concurrency. Возвращает (готовые файлы, {язык: ошибка})."""
+        source_path = task.source_path
+        is_srt = source_path.suffix.lower() == '.srt'
+        with open(source_path, 'r', encoding='utf-8') as f:
+            if is_srt:
+                subs = list(srt.parse(f.read()))
+                texts = [s.content for s in subs]
+            else:
+                texts = [ln.strip() for ln in f.readlines() if ln.strip()]
+        keys, unique = self._unique_lines(texts)
+        # Один бэкенд на все языки: его семафор ограничивает общее число батчей в полёте
+        backend = self._backend(task)
+
+        def translate_one(lang: str) -> Path:
+            backend.check_language(lang)
+
+            def on_progress(done: int, total: int):
+                self.language_progress.emit(task.task_id, lang, 100 * done // total)
+
+            translations = self._translate_keys(backend, unique, lang, task.source_lang, on_progress)
+            translated = [translations[key] for key in keys]
+            output_path = source_path.with_name(f"{source_path.stem}_{lang}{source_path.suffix.lower()}")
+            with open(output_path, 'w', encoding='utf-8') as f:
+                if is_srt:
+                    f.write(srt.compose([srt.Subtitle(s.index, s.start, s.end, t, s.proprietary)
+                                         for s, t in zip(subs, translated)]))
+                else:
+                    f.write("\n".join(translated))
+            return output_path
+
+        done: List[Path] = []
+        errors: Dict[str, str] = {}
+        languages = task.languages
+        with ThreadPoolExecutor(max_workers=min(self.max_languages, len(languages)),
+                                thread_name_prefix="translate") as pool:
+            futures = {pool.submit(translate_one, lang): lang for lang in languages}
+            for future in as_completed(futures):
+                lang = futures[future]
+                try:
+                    output_path = future.result()
+                except Exception as e:
+                    errors[lang] = str(e)
+                    self.log_message.emit("error", f"Ошибка перевода на '{lang}': {e}")
+                    self.language_failed.emit(task.task_id, lang, str(e))
+                    continue
+                done.append(output_path)
+                self.log_message.emit("success", f"Перевод на '{lang}' завершён: {output_path.name}")
+                self.language_progress.emit(task.task_id, lang, 100)
+                self.language_completed.emit(task.task_id, lang, str(output_path))
+        return done, errors
+
+    def process(self, task: TranslationTask) -> Tuple[Optional[str], Optional[str]]:
+        """Синхронно переводит одну задачу в текущем потоке, минуя очередь (консольный запуск);
+        возвращает (путь к результату, текст ошибки)"""
+        return self._process_task(task)
+
     def _process_task(self, task: TranslationTask):
-        """Обработка задачи перевода"""
+        """Обработка задачи перевода; возвращает (путь к результату, текст ошибки)"""
+        if len(task.languages) > 1:
+            return self._process_multi_task(task)
         try:
-            self.log_message.emit("info", f"Начало перевода {task.source_path.name} на '{task.target_lang}'")
+            backend = self._backend(task)
+            backend.check_language(task.target_lang)
+            self.log_message.emit("info", f"Начало перевода {task.source_path.name} на '{task.target_lang}' "
+                                          f"({backend.describe()})")
 
-            # Всегда используем офлайн перевод, игнорируем use_g4f и g4f_model
             if task.source_path.suffix.lower() == '.srt':
-                result_path = self._translate_srt_offline(task.source_path, task.target_lang, task.source_lang)
+                result_path = self._translate_srt(
+                    backend, task.source_path, task.target_lang, task.source_lang,
+                    lambda pct: self.language_progress.emit(task.task_id, task.target_lang, pct))
             elif task.source_path.suffix.lower() == '.txt':
-                result_path = self._translate_txt_offline(task.source_path, task.target_lang, task.source_lang)
+                result_path = self._translate_txt(backend, task.source_path, task.target_lang, task.source_lang)
             else:
                 raise ValueError(f"Неподдерживаемый формат: {task.source_path.suffix}")
 
             self.log_message.emit("success", f"Перевод завершён: {Path(result_path).name}")
+            self._log_limiter(backend)
+            if self.memory is not None:
+                self.log_message.emit("info", self.memory.stats_summary())
+            self.language_completed.emit(task.task_id, task.target_lang, str(result_path))
             self.translation_completed.emit(task.task_id, str(result_path))
+            return str(result_path), None
 
         except Exception as e:
             self.log_message.emit("error", f"Ошибка перевода: {e}")
+            self.language_failed.emit(task.task_id, task.target_lang, str(e))
             self.translation_failed.emit(task.task_id, str(e))
+            return None, str(e)
+
+    def _process_multi_task(self, task: TranslationTask):
+        """Задача перевода сразу на несколько языков; в результат идут пути готовых файлов по строке на файл"""
+        try:
+            if task.source_path.suffix.lower() not in ('.srt', '.txt'):
+                raise ValueError(f"Неподдерживаемый формат: {task.source_path.suffix}")
+            self.log_message.emit("info", f"Начало перевода {task.source_path.name} на "
+                                          f"{len(task.languages)} языков: {', '.join(task.languages)} "
+                                          f"({self._backend(task).describe()})")
+            done, errors = self._translate_languages(task)
+        except Exception as e:
+            self.log_message.emit("error", f"Ошибка перевода: {e}")
+            self.translation_failed.emit(task.task_id, str(e))
+            return None, str(e)
+        self._log_limiter(self._backend(task))
+        if self.memory is not None:
+            self.log_message.emit("info", self.memory.stats_summary())
+        output = "\n".join(str(path) for path in done) or None
+        if errors:
+            error = "; ".join(f"{lang}: {message}" for lang, message in errors.items())
+            self.translation_failed.emit(task.task_id, error)
+            return output, error
+        self.translation_completed.emit(task.task_id, str(done[0].parent))
+        return output, None
+
+    def _log_limiter(self, backend: TranslationBackend):
+        if backend.limiter:
+            self.log_message.emit("info", f"Лимит «{backend.limiter}»: "
+                                          f"{rate_limiter.get(backend.limiter).stats_summary()}")
 
     def run(self):
         """Основной цикл работы воркера"""
         while self._is_running:
+            if self.job_store is not None:
+                claimed = self.job_store.claim(self.job_kind)
+                if claimed is None:
+                    self.msleep(100)
+                    continue
+                job_id, params = claimed
+                output, error = self._process_task(TranslationTask(**params_to_kwargs(params)))
+                self.job_store.finish(job_id, output=output, error=error)
+                continue
             try:
                 task = self.tasks_queue.get(timeout=0.1)
                 self._process_task(task)
@@ -189,4 +351,4 @@ class TranslationWorker(QThread):
     def stop(self):
         """Остановка воркера"""
         self._is_running = False
-        self.translator_cache.clear()
\ No newline at end of file
+        self._backends.clear()
\ No newline at end of file
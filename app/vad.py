@@ -0,0 +1,126 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from .audio import SAMPLE_RATE
+
+# Регион речи в секундах: (начало, конец)
+Region = Tuple[float, float]
+# Участок склеенного аудио: (начало в склейке, начало в оригинале, длительность), всё в секундах
+TimelinePiece = Tuple[float, float, float]
+
+
+def _frame_features(audio: np.ndarray, sr: int, frame_len: int, block_frames: int = 4096):
+    """Энергия (дБ), доля речевой полосы и спектральная плоскостность по кадрам"""
+    n_frames = len(audio) // frame_len
+    freqs = np.fft.rfftfreq(frame_len, d=1.0 / sr)
+    speech_band = (freqs >= 300) & (freqs <= 3400)
+    window = np.hanning(frame_len).astype(np.float32)
+
+    energy_db = np.empty(n_frames, dtype=np.float32)
+    band_ratio = np.empty(n_frames, dtype=np.float32)
+    flatness = np.empty(n_frames, dtype=np.float32)
+
+    # Считаем блоками, чтобы не держать спектр многочасовой записи целиком
+    for start in range(0, n_frames, block_frames):
+        stop = min(n_frames, start + block_frames)
+        frames = audio[start * frame_len:stop * frame_len].reshape(-1, frame_len)
+        rms = np.sqrt(np.mean(frames ** 2, axis=1) + 1e-12)
+        energy_db[start:stop] = 20 * np.log10(rms)
+
+        power = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2 + 1e-12
+        total = power.sum(axis=1)
+        band_ratio[start:stop] = power[:, speech_band].sum(axis=1) / total
+        flatness[start:stop] = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+
+    return energy_db, band_ratio, flatness
+
+
+def detect_speech_regions(audio: np.ndarray, sr: int = SAMPLE_RATE, frame_ms: int = 30,
+                          energy_margin_db: float = 12.0, min_energy_db: float = -50.0,
+                          min_band_ratio: float = 0.2, max_flatness: float = 0.5,
+                          min_speech_ms: int = 250, min_silence_ms: int = 400,
+                          pad_ms: int = 200) -> List[Region]:
+    """Находит участки речи дешёвым энергетическим/спектральным детектором.
+
+    Кадр считается речью, если его энергия выше адаптивного порога (уровень шума + запас),
+    основная энергия лежит в речевой полосе 300–3400 Гц, а спектр не похож на белый шум.
+    Короткие паузы склеиваются, короткие всплески отбрасываются, регионы расширяются на pad_ms.
+    """
+    frame_len = int(sr * frame_ms / 1000)
+    if len(audio) < frame_len:
+        return []
+
+    energy_db, band_ratio, flatness = _frame_features(audio, sr, frame_len)
+    noise_floor = float(np.percentile(energy_db, 10))
+    threshold = max(noise_floor + energy_margin_db, min_energy_db)
+    is_speech = (energy_db > threshold) & (band_ratio >= min_band_ratio) & (flatness <= max_flatness)
+
+    frame_sec = frame_len / sr
+    regions: List[Region] = []
+    edges = np.diff(np.concatenate(([0], is_speech.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    for s, e in zip(starts, ends):
+        start, end = s * frame_sec, e * frame_sec
+        if regions and start - regions[-1][1] < min_silence_ms / 1000:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+
+    duration = len(audio) / sr
+    pad = pad_ms / 1000
+    padded: List[Region] = []
+    for start, end in regions:
+        if end - start < min_speech_ms / 1000:
+            continue
+        start, end = max(0.0, start - pad), min(duration, end + pad)
+        if padded and start <= padded[-1][1]:
+            padded[-1] = (padded[-1][0], end)
+        else:
+            padded.append((start, end))
+    return padded
+
+
+def concat_regions(audio: np.ndarray, regions: List[Region],
+                   sr: int = SAMPLE_RATE) -> Tuple[np.ndarray, List[TimelinePiece]]:
+    """Склеивает участки речи в один буфер и возвращает карту времени для обратного пересчёта"""
+    pieces = []
+    timeline: List[TimelinePiece] = []
+    position = 0.0
+    for start, end in regions:
+        chunk = audio[int(start * sr):int(end * sr)]
+        if chunk.size == 0:
+            continue
+        pieces.append(chunk)
+        length = chunk.size / sr
+        timeline.append((position, start, length))
+        position += length
+    if not pieces:
+        return np.zeros(0, dtype=np.float32), []
+    return np.concatenate(pieces), timeline
+
+
+def map_to_original(t: float, timeline: List[TimelinePiece], is_end: bool = False) -> float:
+    """Переводит время склеенного буфера во время исходной записи.
+
+    is_end=True относит момент на стыке двух участков к концу предыдущего, а не к началу следующего.
+    """
+    for concat_start, orig_start, length in timeline:
+        if t < concat_start + length or (is_end and t <= concat_start + length):
+            return orig_start + max(0.0, t - concat_start)
+    if not timeline:
+        return t
+    concat_start, orig_start, length = timeline[-1]
+    return orig_start + (t - concat_start)
+
+
+def remap_segments(segments: List[dict], timeline: List[TimelinePiece]) -> List[dict]:
+    """Возвращает сегменты Whisper (и слова, если есть) на исходную шкалу времени"""
+    for seg in segments:
+        seg['start'] = map_to_original(seg['start'], timeline)
+        seg['end'] = max(seg['start'], map_to_original(seg['end'], timeline, is_end=True))
+        for word in seg.get('words') or []:
+            word['start'] = map_to_original(word['start'], timeline)
+            word['end'] = map_to_original(word['end'], timeline, is_end=True)
+    return segments
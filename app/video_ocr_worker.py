@@ -1,28 +1,22 @@
 import os
-import cv2
+import importlib.util
 import numpy as np
 from pathlib import Path
 from typing import List, Optional, Tuple, Dict
-from queue import Queue, Empty
+from queue import Empty
 from datetime import timedelta
 
 from PyQt6.QtCore import QThread, pyqtSignal
 import srt
-from moviepy.editor import VideoFileClip
 
 from .models import TranscriptionTask
+from .job_store import JobStore, params_to_kwargs
+from .scheduler import POLICIES, ScheduledQueue, estimate_cost, order_by_sql
 
-try:
-    import pytesseract
-    TESSERACT_AVAILABLE = True
-except ImportError:
-    TESSERACT_AVAILABLE = False
-
-try:
-    import easyocr
-    EASYOCR_AVAILABLE = True
-except ImportError:
-    EASYOCR_AVAILABLE = False
+# cv2, pytesseract и easyocr (тянет torch) импортируются при первом использовании,
+# чтобы не замедлять запуск приложения; здесь только проверяем, что пакеты установлены
+TESSERACT_AVAILABLE = importlib.util.find_spec("pytesseract") is not None
+EASYOCR_AVAILABLE = importlib.util.find_spec("easyocr") is not None
 
 
 class VideoOCRWorker(QThread):
@@ -32,16 +26,40 @@ class VideoOCRWorker(QThread):
     task_completed = pyqtSignal(str, str)
     task_failed = pyqtSignal(str, str)
     log_message = pyqtSignal(str, str)
+    job_kind = "ocr"
     
-    def __init__(self):
+    def __init__(self, job_store: Optional[JobStore] = None):
         super().__init__()
-        self.tasks_queue = Queue()
+        self.tasks_queue = ScheduledQueue()
+        self.job_store = job_store
         self._is_running = True
         self._is_processing_paused = False
         self.easyocr_reader = None
         
     def add_task(self, task: TranscriptionTask):
-        self.tasks_queue.put(task)
+        task.cost = estimate_cost(task)
+        if self.job_store is not None:
+            self.job_store.save(self.job_kind, task, state="queued")
+        else:
+            self.tasks_queue.put(task)
+
+    def add_tasks(self, tasks: List[TranscriptionTask]):
+        for task in tasks:
+            task.cost = estimate_cost(task)
+        if self.job_store is not None:
+            self.job_store.save_many(self.job_kind, tasks, state="queued")
+        else:
+            for task in tasks:
+                self.tasks_queue.put(task)
+
+    def set_policy(self, policy: str):
+        """Порядок очереди: fifo, shortest, priority или deadline (см. app/scheduler.py)"""
+        self.tasks_queue.policy = policy if policy in POLICIES else "fifo"
+
+    def set_priority(self, task_id: str, priority: int):
+        self.tasks_queue.set_priority(task_id, priority)
+        if self.job_store is not None:
+            self.job_store.set_priority(task_id, priority)
         
     def stop_processing(self):
         self._is_processing_paused = True
@@ -53,9 +71,12 @@ class VideoOCRWorker(QThread):
     def clear_queue(self):
         with self.tasks_queue.mutex:
             self.tasks_queue.queue.clear()
+        if self.job_store is not None:
+            self.job_store.unqueue(self.job_kind)
     
     def _detect_subtitle_region(self, frame: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
         """Автоматическое обнаружение области субтитров"""
+        import cv2
         height, width = frame.shape[:2]
         
         # Обычно субтитры находятся в нижней части экрана
@@ -91,6 +112,7 @@ class VideoOCRWorker(QThread):
     
     def _preprocess_frame(self, frame: np.ndarray, region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
         """Предобработка кадра для улучшения OCR"""
+        import cv2
         if region:
             x, y, w, h = region
             frame = frame[y:y+h, x:x+w]
@@ -118,6 +140,7 @@ class VideoOCRWorker(QThread):
         """Извлечение текста с помощью Tesseract"""
         if not TESSERACT_AVAILABLE:
             raise ImportError("Tesseract не установлен. Установите: pip install pytesseract")
+        import pytesseract
         
         # Конфигурация Tesseract для лучшего распознавания субтитров
         config = '--oem 3 --psm 8 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,!?;:()[]{}"\'- '
@@ -142,6 +165,7 @@ class VideoOCRWorker(QThread):
                 'ita': 'it'
             }
             ocr_lang = lang_map.get(language, 'en')
+            import easyocr
             self.easyocr_reader = easyocr.Reader([ocr_lang], gpu=False)
         
         results = self.easyocr_reader.readtext(frame)
@@ -152,6 +176,7 @@ class VideoOCRWorker(QThread):
     
     def _extract_subtitles_from_video(self, task: TranscriptionTask) -> List[Dict]:
         """Извлечение субтитров из видео"""
+        import cv2
         video_path = task.video_path
         self.log_message.emit("info", f"Начало OCR обработки: {video_path.name}")
         
@@ -257,6 +282,10 @@ class VideoOCRWorker(QThread):
             for segment in segments:
                 f.write(segment['text'].strip() + '\n')
     
+    def process(self, task: TranscriptionTask):
+        """Синхронно обрабатывает одну задачу в текущем потоке, минуя очередь (консольный запуск)"""
+        self._process_task(task)
+
     def _process_task(self, task: TranscriptionTask):
         """Обработка задачи OCR"""
         try:
@@ -285,11 +314,13 @@ class VideoOCRWorker(QThread):
             else:
                 self._save_as_txt(subtitles, output_path)
             
+            task.status, task.result_path = "completed", output_path
             self.progress_updated.emit(task.task_id, 100)
             self.task_completed.emit(task.task_id, str(output_path))
             self.log_message.emit("success", f"OCR задача завершена для: {task.video_path.name}")
             
         except Exception as e:
+            task.status, task.error = "failed", str(e)
             self.task_failed.emit(task.task_id, str(e))
             self.log_message.emit("error", f"Ошибка OCR задачи для {task.video_path.name}: {e}")
     
@@ -297,6 +328,17 @@ class VideoOCRWorker(QThread):
         """Основной цикл воркера"""
         while self._is_running:
             if not self._is_processing_paused:
+                if self.job_store is not None:
+                    claimed = self.job_store.claim(self.job_kind, order_by_sql(self.tasks_queue.policy))
+                    if claimed is None:
+                        self.msleep(100)
+                        continue
+                    job_id, params = claimed
+                    task = TranscriptionTask(**params_to_kwargs(params))
+                    self._process_task(task)
+                    self.job_store.finish(job_id, output=str(task.result_path) if task.result_path else None,
+                                          error=task.error if task.status == "failed" else None)
+                    continue
                 try:
                     task = self.tasks_queue.get(timeout=0.1)
                     self._process_task(task)
@@ -309,7 +351,9 @@ class VideoOCRWorker(QThread):
     def stop(self):
         """Остановка воркера"""
         self._is_running = False
-        self.clear_queue()
+        # Задания в хранилище остаются в очереди до следующего запуска
+        with self.tasks_queue.mutex:
+            self.tasks_queue.queue.clear()
 
 
 
@@ -0,0 +1,43 @@
+import importlib
+import time
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+# Тяжёлые модули в порядке прогрева и сообщение для заставки
+WARMUP_MODULES = [
+    ("numpy", "Загрузка NumPy..."),
+    ("torch", "Загрузка PyTorch..."),
+    ("whisper", "Загрузка Whisper..."),
+    ("cv2", "Загрузка OpenCV..."),
+]
+
+
+class WarmupWorker(QThread):
+    """Фоновый импорт тяжёлых модулей после показа окна.
+
+    Пока он идёт, интерфейс уже работает; первая задача не ждёт импорта torch/whisper,
+    если прогрев успел закончиться. По завершении сообщает, доступна ли CUDA.
+    """
+
+    status_changed = pyqtSignal(str)
+    warmup_finished = pyqtSignal(bool)
+    log_message = pyqtSignal(str, str)
+
+    def run(self):
+        started = time.perf_counter()
+        for module_name, status in WARMUP_MODULES:
+            self.status_changed.emit(status)
+            try:
+                importlib.import_module(module_name)
+            except Exception as e:
+                self.log_message.emit("warning", f"Не удалось загрузить модуль {module_name}: {e}")
+
+        cuda_available = False
+        try:
+            import torch
+            cuda_available = torch.cuda.is_available()
+        except Exception:
+            pass
+        self.status_changed.emit("Готово")
+        self.log_message.emit("info", f"Библиотеки загружены за {time.perf_counter() - started:.1f} сек")
+        self.warmup_finished.emit(cuda_available)
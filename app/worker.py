@@ -1,37 +1,91 @@
 import os
+import threading
+import time
 from pathlib import Path
-from typing import List, Optional
-from queue import Queue, Empty
+from typing import List, Optional, Tuple
+from queue import Empty
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
 from PyQt6.QtCore import QThread, pyqtSignal
-import whisper
-import torch
-from moviepy.editor import VideoFileClip
+import numpy as np
 import srt
 
 from .models import TranscriptionTask, DeviceType
-from .g4f_client import g4f_batch_rewrite
+from .g4f_client import g4f_rewrite_lines, stats_summary as g4f_stats_summary
+from .audio import load_audio, SAMPLE_RATE
+from .vad import detect_speech_regions, concat_regions, remap_segments, map_to_original
+from .chunked import transcribe_parallel, plan_windows
+from .model_registry import ModelRegistry
+from .hashing import media_fingerprint, params_key
+from .result_cache import ResultCache
+from .audio_cache import AudioCache
+from .correction_cache import CorrectionCache
+from .correction_policy import CorrectionPolicy
+from .checkpoint import TranscriptionCheckpoint
+from .job_store import JobStore, params_to_kwargs
+from .scheduler import POLICIES, ScheduledQueue, estimate_cost, order_by_sql
+from .progress import ProgressTracker, PartialSrtWriter, install_whisper_progress_hook, whisper_progress
 
 
 class TranscriptionWorker(QThread):
     progress_updated = pyqtSignal(str, int)
+    progress_details = pyqtSignal(str, float, float)  # task_id, ETA в секундах (-1 — неизвестно), x реального времени
     task_completed = pyqtSignal(str, str)
     task_failed = pyqtSignal(str, str)
     log_message = pyqtSignal(str, str)
     model_loaded = pyqtSignal(bool)
+    correction_selected = pyqtSignal(str, int, int)  # task_id, отправлено на коррекцию, всего сегментов
+    job_kind = "transcription"
+    # Не чаще раза в столько секунд частичный SRT перезаписывается потоковыми строками коррекции
+    PARTIAL_REWRITE_INTERVAL = 1.0
 
-    def __init__(self):
+    def __init__(self, max_slots: int = 1, result_cache: Optional[ResultCache] = None,
+                 checkpoint_dir: Optional[Path] = None, audio_cache: Optional[AudioCache] = None,
+                 job_store: Optional[JobStore] = None, correction_cache: Optional[CorrectionCache] = None):
         super().__init__()
-        self.tasks_queue = Queue()
-        self.current_model = None
-        self.current_model_size: Optional[str] = None
-        self.current_device: Optional[str] = None
+        self.tasks_queue = ScheduledQueue()
+        # С хранилищем задания берутся из SQLite, без него — из очереди в памяти
+        self.job_store = job_store
+        self.result_cache = result_cache
+        self.audio_cache = audio_cache
+        self.correction_cache = correction_cache
+        self.checkpoint_dir = checkpoint_dir
+        self.model_registry = ModelRegistry(self._load_model, log=self.log_message.emit)
+        self.max_slots = max(1, max_slots)
+        self._active_slots = 0
+        self._slots_lock = threading.Lock()
         self._is_running = True
         self._is_processing_paused = False
 
     def add_task(self, task: TranscriptionTask):
-        self.tasks_queue.put(task)
+        task.cost = estimate_cost(task)
+        if self.job_store is not None:
+            self.job_store.save(self.job_kind, task, state="queued")
+        else:
+            self.tasks_queue.put(task)
+
+    def add_tasks(self, tasks: List[TranscriptionTask]):
+        for task in tasks:
+            task.cost = estimate_cost(task)
+        if self.job_store is not None:
+            self.job_store.save_many(self.job_kind, tasks, state="queued")
+        else:
+            for task in tasks:
+                self.tasks_queue.put(task)
+
+    def set_policy(self, policy: str):
+        """Порядок очереди: fifo, shortest, priority или deadline (см. app/scheduler.py)"""
+        self.tasks_queue.policy = policy if policy in POLICIES else "fifo"
+
+    def set_priority(self, task_id: str, priority: int):
+        self.tasks_queue.set_priority(task_id, priority)
+        if self.job_store is not None:
+            self.job_store.set_priority(task_id, priority)
+
+    def set_max_slots(self, max_slots: int):
+        """Число задач, транскрибируемых одновременно (применяется к следующим задачам)"""
+        self.max_slots = max(1, max_slots)
 
     def stop_processing(self):
         self._is_processing_paused = True
@@ -43,48 +97,101 @@ class TranscriptionWorker(QThread):
     def clear_queue(self):
         with self.tasks_queue.mutex:
             self.tasks_queue.queue.clear()
+        if self.job_store is not None:
+            self.job_store.unqueue(self.job_kind)
 
-    def _load_model(self, size: str, device: str):
-        if self.current_model and self.current_model_size == size and self.current_device == device:
-            return
-        self.current_model = None
-        self.current_model_size = size
-        self.current_device = device
-        resolved_device = "cuda" if device == DeviceType.CUDA.value and torch.cuda.is_available() else "cpu"
+    def _next_task(self) -> Optional[Tuple[TranscriptionTask, Optional[int]]]:
+        """Следующая задача и id задания в хранилище (None для очереди в памяти)"""
+        if self.job_store is not None:
+            claimed = self.job_store.claim(self.job_kind, order_by_sql(self.tasks_queue.policy))
+            if claimed is None:
+                return None
+            job_id, params = claimed
+            return TranscriptionTask(**params_to_kwargs(params)), job_id
+        try:
+            return self.tasks_queue.get(timeout=0.1), None
+        except Empty:
+            return None
+
+    @staticmethod
+    def _resolve_device(device: str) -> str:
+        import torch
+        return "cuda" if device == DeviceType.CUDA.value and torch.cuda.is_available() else "cpu"
+
+    def _load_model(self, size: str, device: str) -> Tuple[object, str]:
+        # whisper и torch импортируются при первой загрузке модели, а не при старте приложения
+        import whisper
+        try:
+            install_whisper_progress_hook()
+        except Exception:
+            # Без хука прогресс обновляется только после каждого окна
+            pass
+        resolved_device = self._resolve_device(device)
         self.log_message.emit("info", f"Загрузка модели Whisper '{size}' на '{resolved_device}'...")
         try:
-            self.current_model = whisper.load_model(size, device=resolved_device)
+            model = whisper.load_model(size, device=resolved_device)
             self.log_message.emit("success", "Модель загружена.")
             self.model_loaded.emit(True)
+            return model, resolved_device
         except RuntimeError as e:
             if "CUDA" in str(e) and resolved_device == "cuda":
                 self.log_message.emit("warning", f"Ошибка CUDA: {e}")
                 self.log_message.emit("info", "Переключение на CPU...")
                 try:
-                    self.current_model = whisper.load_model(size, device="cpu")
-                    self.current_device = "cpu"
+                    model = whisper.load_model(size, device="cpu")
                     self.log_message.emit("success", "Модель загружена на CPU.")
                     self.model_loaded.emit(True)
+                    return model, "cpu"
                 except Exception as cpu_error:
                     self.log_message.emit("error", f"Ошибка загрузки на CPU: {cpu_error}")
-                    self.model_loaded.emit(False)
             else:
                 self.log_message.emit("error", f"Ошибка загрузки модели: {e}")
-                self.model_loaded.emit(False)
         except Exception as e:
             self.log_message.emit("error", f"Ошибка загрузки модели: {e}")
-            self.model_loaded.emit(False)
+        self.model_loaded.emit(False)
+        raise RuntimeError("Модель не загружена.")
 
-    def _extract_audio(self, video_path: Path, output_dir: Path) -> Path:
+    def _extract_audio(self, video_path: Path, fingerprint: Optional[str] = None) -> np.ndarray:
         abs_video = video_path.resolve()
         self.log_message.emit("debug", f"Путь к видео: {abs_video}")
         if not abs_video.exists():
             raise FileNotFoundError(f"Файл не найден: {abs_video}")
+        if self.audio_cache is not None and fingerprint:
+            return self.audio_cache.load(abs_video, fingerprint)
+        return load_audio(abs_video)
+
+    def _apply_vad(self, audio: np.ndarray):
+        regions = detect_speech_regions(audio)
+        speech_audio, timeline = concat_regions(audio, regions)
+        total = len(audio) / SAMPLE_RATE
+        kept = len(speech_audio) / SAMPLE_RATE
+        share = kept / total * 100 if total else 0.0
+        self.log_message.emit("info", f"VAD: {len(regions)} участков речи, {kept:.1f} из {total:.1f} сек ({share:.0f}%)")
+        return speech_audio, timeline
 
-        video = VideoFileClip(str(abs_video))
-        audio_path = output_dir / f"{video_path.stem}.wav"
-        video.audio.write_audiofile(str(audio_path), codec="pcm_s16le")
-        return audio_path
+    def _transcribe_chunked(self, task: TranscriptionTask, audio: np.ndarray, language: Optional[str],
+                            checkpoint: Optional[TranscriptionCheckpoint], tracker: ProgressTracker,
+                            audio_path: Optional[Path] = None, partial: Optional[PartialSrtWriter] = None,
+                            timeline=None) -> List[dict]:
+        def on_window_done(done: int, total: int):
+            tracker.update(tracker.total_sec * done / total, force=True)
+            self.log_message.emit("info", f"Окно {done}/{total} транскрибировано")
+
+        self.log_message.emit(
+            "info",
+            f"Параллельная транскрибация: окна по {task.chunk_window_sec:.0f} сек, "
+            f"перекрытие {task.chunk_overlap_sec:.0f} сек"
+        )
+        return transcribe_parallel(
+            audio, task.model_size, self._resolve_device(task.device), language,
+            task.chunk_window_sec, task.chunk_overlap_sec, task.chunk_processes,
+            on_window_done=on_window_done,
+            completed=checkpoint.load() if checkpoint else None,
+            on_window_result=checkpoint.commit if checkpoint else None,
+            audio_path=audio_path,
+            # Окна завершаются вразнобой, в частичный SRT они попадают по порядку
+            on_ordered=(lambda segments: self._write_partial(partial, segments, timeline)) if partial else None
+        )
 
     def _save_as_srt(self, segments: List[dict], output_path: Path):
         srt_segments = [
@@ -104,41 +211,220 @@ class TranscriptionWorker(QThread):
             for segment in segments:
                 f.write(segment['text'].strip() + '\n')
 
-    def _g4f_refine_segments(self, segments: List[dict], model: str, lang_hint: str):
-        texts = [seg['text'] for seg in segments]
-        batch_size = 40
-        refined = []
-        for i in range(0, len(texts), batch_size):
-            chunk = texts[i:i + batch_size]
-            out = g4f_batch_rewrite(chunk, model, lang_hint)
-            refined.extend(out)
-        for seg, new_text in zip(segments, refined):
-            seg['text'] = new_text
+    def _g4f_refine_segments(self, task: TranscriptionTask, segments: List[dict], lang_hint: str,
+                             partial: Optional[PartialSrtWriter] = None):
+        # Коррекция занимает отрезок 70–85% общего прогресса; батчи и потоковые строки
+        # завершаются вразнобой, поэтому прогресс только растёт. Потоковые строки сразу
+        # попадают в частичный SRT: он перезаписывается после батча и не чаще
+        # PARTIAL_REWRITE_INTERVAL между ними. Строки предварительные — итоговый файл
+        # пишется по окончательному ответу.
+        lock = threading.Lock()
+        state = {"progress": 70, "received": set(), "dirty": False, "written": 0.0}
+        live = [seg['text'] for seg in segments]
+
+        def advance(pct: int):
+            with lock:
+                if pct <= state["progress"]:
+                    return
+                state["progress"] = pct
+            self.progress_updated.emit(task.task_id, pct)
+
+        def write_partial(force: bool):
+            if partial is None:
+                return
+            with lock:
+                now = time.monotonic()
+                if not state["dirty"] or (not force and now - state["written"] < self.PARTIAL_REWRITE_INTERVAL):
+                    return
+                state["dirty"], state["written"] = False, now
+                partial.rewrite((seg['start'], seg['end'], text) for seg, text in zip(segments, live))
+
+        def on_batch_done(done: int, total: int):
+            write_partial(force=True)
+            advance(70 + 15 * done // total)
+
+        def on_line(index: int, text: str):
+            with lock:
+                state["received"].add(index)
+                received = len(state["received"])
+                if sent[index] in targets and text:
+                    live[sent[index]] = text
+                    state["dirty"] = True
+            write_partial(force=False)
+            advance(70 + 15 * received // len(sent))
+
+        if not segments:
+            return
+        sent, targets = CorrectionPolicy.from_task(task).select(segments)
+        self.correction_selected.emit(task.task_id, len(targets), len(segments))
+        self.log_message.emit("info", f"На коррекцию: {len(targets)} из {len(segments)} сегментов "
+                                      f"({len(targets) / len(segments):.0%}), с контекстом {len(sent)}")
+        if not targets:
+            return
+        refined = g4f_rewrite_lines([segments[i]['text'] for i in sent], task.g4f_model, lang_hint,
+                                    max_tokens=task.g4f_batch_tokens, max_concurrency=task.g4f_max_concurrency,
+                                    on_batch_done=on_batch_done, log=self.log_message.emit,
+                                    cache=self.correction_cache, on_line=on_line if task.g4f_stream else None)
+        for i, new_text in zip(sent, refined):
+            if i in targets:
+                segments[i]['text'] = new_text
+        self.log_message.emit("info", g4f_stats_summary())
+        if self.correction_cache is not None:
+            self.log_message.emit("info", self.correction_cache.stats_summary())
+
+    def _task_key(self, task: TranscriptionTask, fingerprint: Optional[str]) -> Optional[str]:
+        """Ключ кэша и чекпоинта: содержимое медиа плюс параметры, влияющие на сегменты"""
+        if fingerprint is None or (self.result_cache is None and self.checkpoint_dir is None):
+            return None
+        params = {
+            "model_size": task.model_size,
+            "language": task.language,
+            "use_vad": task.use_vad,
+        }
+        if task.use_parallel_chunks:
+            params.update(chunk_window_sec=task.chunk_window_sec, chunk_overlap_sec=task.chunk_overlap_sec)
+        else:
+            # Последовательный режим режет запись окнами checkpoint_window_sec, и от них зависят сегменты
+            params.update(checkpoint_window_sec=task.checkpoint_window_sec)
+        return params_key(fingerprint, params)
+
+    def _checkpoint_path(self, task_key: str) -> Path:
+        return self.checkpoint_dir / f"{task_key}.jsonl"
+
+    def _make_tracker(self, task: TranscriptionTask, total_sec: float, done_sec: float = 0.0) -> ProgressTracker:
+        def emit(pct: int, eta: float, speed: float):
+            self.progress_updated.emit(task.task_id, pct)
+            self.progress_details.emit(task.task_id, eta, speed)
+        return ProgressTracker(total_sec, emit, done_sec=done_sec)
+
+    @staticmethod
+    def _write_partial(partial: Optional[PartialSrtWriter], segments: List[dict], timeline):
+        if partial is None:
+            return
+        if timeline is None:
+            partial.append((seg['start'], seg['end'], seg['text']) for seg in segments)
+        else:
+            partial.append((map_to_original(seg['start'], timeline),
+                            map_to_original(seg['end'], timeline, is_end=True), seg['text']) for seg in segments)
+
+    def _transcribe_windows(self, task: TranscriptionTask, audio: np.ndarray, language: Optional[str],
+                            checkpoint: Optional[TranscriptionCheckpoint],
+                            partial: Optional[PartialSrtWriter], timeline) -> List[dict]:
+        """Последовательная транскрибация окнами по паузам.
+
+        После каждого окна сегменты сохраняются в чекпоинт и дописываются в частичный SRT,
+        а внутри окна прогресс идёт по времени, которое уже декодировал Whisper.
+        """
+        completed = checkpoint.load() if checkpoint else {}
+        resumed = TranscriptionCheckpoint.committed_seconds(completed, SAMPLE_RATE)
+        if completed:
+            self.log_message.emit("info", f"Продолжение с чекпоинта: готово {resumed:.0f} сек записи")
+        tracker = self._make_tracker(task, len(audio) / SAMPLE_RATE, done_sec=resumed)
+        windows = plan_windows(audio, task.checkpoint_window_sec, 0)
+        segments: List[dict] = []
+        model, device = None, None
+        try:
+            for start, end, _, _ in windows:
+                offset = start / SAMPLE_RATE
+                if (start, end) in completed:
+                    window_segments = completed[(start, end)]
+                else:
+                    if model is None:
+                        model, device = self.model_registry.acquire(task.model_size, task.device)
+                    # Хвост предыдущего окна служит подсказкой, чтобы не терять контекст на стыке
+                    prompt = " ".join(seg['text'].strip() for seg in segments[-3:]) or None
+                    with whisper_progress(lambda decoded: tracker.update(offset + decoded)):
+                        result = model.transcribe(
+                            audio[start:end],
+                            language=language,
+                            fp16=device == "cuda",
+                            initial_prompt=prompt,
+                            verbose=False
+                        )
+                    window_segments = result.get('segments', [])
+                    for seg in window_segments:
+                        seg['start'] += offset
+                        seg['end'] += offset
+                    if checkpoint:
+                        checkpoint.commit(start, end, window_segments)
+                segments.extend(window_segments)
+                self._write_partial(partial, window_segments, timeline)
+                tracker.update(end / SAMPLE_RATE, force=True)
+        finally:
+            if model is not None:
+                self.model_registry.release(task.model_size, task.device, model, device)
+        for i, seg in enumerate(segments):
+            seg['id'] = i
+        return segments
+
+    def _transcribe_task(self, task: TranscriptionTask, task_key: Optional[str], fingerprint: Optional[str],
+                         partial: Optional[PartialSrtWriter]) -> List[dict]:
+        audio = self._extract_audio(task.video_path, fingerprint)
+        # Процессы пула читают аудио из того же .npy, если оно взято из кэша и не пересобиралось VAD
+        audio_path = None
+        if self.audio_cache and fingerprint and isinstance(audio, np.memmap):
+            audio_path = self.audio_cache.path_for(fingerprint)
+        timeline = None
+        if task.use_vad:
+            audio, timeline = self._apply_vad(audio)
+            audio_path = None
+        self.progress_updated.emit(task.task_id, 15)
+        use_chunks = task.use_parallel_chunks and len(audio) > task.chunk_window_sec * SAMPLE_RATE
+        checkpoint = None
+        if task_key and self.checkpoint_dir is not None and audio.size:
+            # Сегменты в чекпоинте хранятся на шкале аудио после VAD, пересчёт времени — в конце
+            checkpoint = TranscriptionCheckpoint(self._checkpoint_path(task_key), {
+                "mode": "parallel" if use_chunks else "sequential",
+                "window_sec": task.chunk_window_sec if use_chunks else task.checkpoint_window_sec,
+                "overlap_sec": task.chunk_overlap_sec if use_chunks else 0,
+                "samples": int(len(audio)),
+            })
+        self.progress_updated.emit(task.task_id, 30)
+        self.log_message.emit("info", f"Транскрибация аудио для {task.video_path.name}...")
+        language = task.language if task.language != "auto" else None
+        segments = []
+        if use_chunks:
+            tracker = self._make_tracker(task, len(audio) / SAMPLE_RATE)
+            segments = self._transcribe_chunked(task, audio, language, checkpoint, tracker, audio_path,
+                                                partial, timeline)
+        elif audio.size:
+            segments = self._transcribe_windows(task, audio, language, checkpoint, partial, timeline)
+        if timeline is not None:
+            remap_segments(segments, timeline)
+        return segments
+
+    def process(self, task: TranscriptionTask):
+        """Синхронно обрабатывает одну задачу в текущем потоке, минуя очередь (консольный запуск).
+        Результат приходит теми же сигналами task_completed/task_failed и в task.status."""
+        self._process_task(task)
 
     def _process_task(self, task: TranscriptionTask):
         try:
             self.log_message.emit("info", f"Начало задачи для: {task.video_path.name}")
             self.progress_updated.emit(task.task_id, 5)
-            self._load_model(task.model_size, task.device)
-            if not self.current_model:
-                raise RuntimeError("Модель не загружена.")
-            self.progress_updated.emit(task.task_id, 15)
-            audio_path = self._extract_audio(task.video_path, task.output_dir)
-            self.progress_updated.emit(task.task_id, 30)
-            self.log_message.emit("info", f"Транскрибация аудио для {task.video_path.name}...")
-            result = self.current_model.transcribe(
-                str(audio_path),
-                language=task.language if task.language != "auto" else None,
-                fp16=torch.cuda.is_available() and self.current_device == "cuda",
-                verbose=False
-            )
+            fingerprint = None
+            if self.result_cache or self.checkpoint_dir or self.audio_cache:
+                fingerprint = media_fingerprint(task.video_path)
+            task_key = self._task_key(task, fingerprint)
+            segments = self.result_cache.get(task_key) if self.result_cache and task_key else None
+            partial = None
+            if segments is not None:
+                self.log_message.emit("info", f"Результат транскрибации взят из кэша: {task.video_path.name}")
+            else:
+                if task.output_format == "srt":
+                    partial = PartialSrtWriter(task.output_dir / f"{task.video_path.stem}.partial.srt")
+                segments = self._transcribe_task(task, task_key, fingerprint, partial)
+                if self.result_cache and task_key:
+                    self.result_cache.put(task_key, segments, meta={
+                        "file": task.video_path.name,
+                        "model_size": task.model_size,
+                        "language": task.language,
+                    })
             self.progress_updated.emit(task.task_id, 70)
-            if os.path.exists(audio_path):
-                os.unlink(audio_path)
-            segments = result.get('segments', [])
             if task.use_g4f_correction and segments:
                 self.log_message.emit("info", "Коррекция текста через g4f...")
-                self._g4f_refine_segments(segments, task.g4f_model, task.language if task.language != "auto" else "")
+                self._g4f_refine_segments(task, segments, task.language if task.language != "auto" else "",
+                                          partial)
             self.progress_updated.emit(task.task_id, 85)
             output_name = task.video_path.stem
             output_path = task.output_dir / f"{output_name}.{task.output_format}"
@@ -146,25 +432,59 @@ class TranscriptionWorker(QThread):
                 self._save_as_srt(segments, output_path)
             else:
                 self._save_as_txt(segments, output_path)
+            if partial is not None:
+                partial.remove()
+            if task_key and self.checkpoint_dir is not None:
+                # Чекпоинт нужен, пока не записан итоговый файл: падение в коррекции не теряет транскрибацию
+                self._checkpoint_path(task_key).unlink(missing_ok=True)
+            task.status, task.result_path = "completed", output_path
             self.progress_updated.emit(task.task_id, 100)
             self.task_completed.emit(task.task_id, str(output_path))
             self.log_message.emit("success", f"Задача завершена для: {task.video_path.name}")
         except Exception as e:
+            task.status, task.error = "failed", str(e)
             self.task_failed.emit(task.task_id, str(e))
             self.log_message.emit("error", f"Ошибка задачи для {task.video_path.name}: {e}")
 
+    def _run_slot(self, task: TranscriptionTask, job_id: Optional[int]):
+        try:
+            self._process_task(task)
+        finally:
+            if job_id is None:
+                self.tasks_queue.task_done()
+            else:
+                self.job_store.finish(job_id, output=str(task.result_path) if task.result_path else None,
+                                      error=task.error if task.status == "failed" else None)
+            with self._slots_lock:
+                self._active_slots -= 1
+
+    def _has_free_slot(self) -> bool:
+        with self._slots_lock:
+            return self._active_slots < self.max_slots
+
     def run(self):
-        while self._is_running:
-            if not self._is_processing_paused:
-                try:
-                    task = self.tasks_queue.get(timeout=0.1)
-                    self._process_task(task)
-                    self.tasks_queue.task_done()
-                except Empty:
+        # Слоты — потоки пула; каждая задача сама шлёт progress_updated/task_completed/task_failed
+        executor = ThreadPoolExecutor(max_workers=max(self.max_slots, os.cpu_count() or 1),
+                                      thread_name_prefix="transcription-slot")
+        try:
+            while self._is_running:
+                self.model_registry.unload_idle()
+                if self._is_processing_paused or not self._has_free_slot():
+                    self.msleep(100 if not self._is_processing_paused else 200)
+                    continue
+                claimed = self._next_task()
+                if claimed is None:
                     self.msleep(100)
-            else:
-                self.msleep(200)
+                    continue
+                with self._slots_lock:
+                    self._active_slots += 1
+                executor.submit(self._run_slot, *claimed)
+        finally:
+            executor.shutdown(wait=True)
+            self.model_registry.clear()
 
     def stop(self):
         self._is_running = False
-        self.clear_queue()
+        # Задания в хранилище остаются в очереди до следующего запуска
+        with self.tasks_queue.mutex:
+            self.tasks_queue.queue.clear()
@@ -0,0 +1,68 @@
+"""Коррекция через g4f последовательно и с параллельными батчами на локальном тестовом сервере.
+
+Запуск из корня репозитория:
+    python -m benchmarks.g4f_concurrency
+    python -m benchmarks.g4f_concurrency --segments 2000 --latency 0.5 --concurrency 1 4 8 --fail-rate 0.05
+    python -m benchmarks.g4f_concurrency --mismatch-rate 1 --bad-lines 5   # повтор батчей половинами
+    python -m benchmarks.g4f_concurrency --stream   # потоковые ответы: время до первой строки
+"""
+import argparse
+import time
+
+from app import g4f_client
+from benchmarks.mock_chat_server import start_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=800, help="число строк транскрипта")
+    parser.add_argument("--latency", type=float, default=0.3, help="задержка ответа сервера, сек")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="доля запросов, завершающихся ошибкой")
+    parser.add_argument("--mismatch-rate", type=float, default=0.0,
+                        help="вероятность потерять строку в ответе на батч со «сбойной» строкой")
+    parser.add_argument("--bad-lines", type=int, default=0, help="сколько строк сбивают модель")
+    parser.add_argument("--max-tokens", type=int, default=1000, help="оценочный размер батча в токенах")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--stream", action="store_true", help="читать ответы потоком (SSE)")
+    args = parser.parse_args()
+
+    server, base = start_server(args.latency, fail_rate=args.fail_rate, mismatch_rate=args.mismatch_rate)
+    g4f_client.configure(api_base=base)
+    lines = [f"строка номер {i} из транскрипта" for i in range(args.segments)]
+    step = max(1, args.segments // max(1, args.bad_lines))
+    for i in range(0, args.segments, step)[:args.bad_lines]:
+        lines[i] += " ~"
+    warnings = []
+    batches = len(g4f_client.token_batches(lines, args.max_tokens))
+
+    print(f"{args.segments} строк, батчей {batches} по ~{args.max_tokens} токенов, задержка {args.latency:.2f} сек")
+    print(f"{'параллельно':>11} {'время, с':>9} {'строк/с':>8} {'ускорение':>10} {'исправлено':>11} "
+          f"{'1-я строка, с':>14}")
+    baseline = None
+    for concurrency in args.concurrency:
+        warnings.clear()
+        requests_before = server.requests
+        first_line = []
+        started = time.perf_counter()
+        # Без потока первая строка становится известна только по завершении батча
+        on_line = (lambda index, text: first_line or first_line.append(time.perf_counter())) if args.stream else None
+        on_batch_done = None if args.stream else lambda done, total: first_line or first_line.append(time.perf_counter())
+        result = g4f_client.g4f_rewrite_lines(lines, "mock", max_tokens=args.max_tokens, max_concurrency=concurrency,
+                                              on_batch_done=on_batch_done, on_line=on_line,
+                                              log=lambda level, message: level == "warning" and warnings.append(message))
+        elapsed = time.perf_counter() - started
+        assert len(result) == len(lines), "порядок/число строк нарушены"
+        assert all(r.lower() == l for r, l in zip(result, lines) if r != l), "строки перепутаны"
+        baseline = baseline or elapsed
+        corrected = sum(r != l for r, l in zip(result, lines))
+        print(f"{concurrency:>11} {elapsed:>9.2f} {len(lines) / elapsed:>8.0f} {baseline / elapsed:>9.1f}x "
+              f"{corrected / len(lines):>10.0%} {(first_line or [started])[0] - started:>14.2f}")
+        if server.requests - requests_before > batches:
+            print(f"{'':>11} запросов {server.requests - requests_before} на {batches} батчей (повторы половинами)")
+        if warnings:
+            print(f"{'':>11} упавших батчей: {len(warnings)} (строки оставлены как есть)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Время импорта модулей интерфейса по данным python -X importtime.
+
+Запуск из корня репозитория:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module ui.main_window --max-ms 1500
+
+Код возврата 1, если импорт упал, подтянулся какой-либо тяжёлый модуль
+(они должны загружаться лениво или в фоновом прогреве) или превышен --max-ms.
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+# Эти модули не должны импортироваться до показа окна
+HEAVY_MODULES = ["torch", "whisper", "cv2", "moviepy", "easyocr", "pytesseract", "g4f", "translate"]
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def measure(module: str):
+    """Возвращает [(модуль, собственное время мкс, накопленное мкс, уровень вложенности)] и stderr"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    rows = []
+    errors = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(parts[0]), int(parts[1]), depth))
+    return rows, proc.returncode, "\n".join(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="ui.main_window", help="модуль для замера")
+    parser.add_argument("--max-ms", type=float, default=0, help="допустимое время импорта, мс (0 — не проверять)")
+    parser.add_argument("--top", type=int, default=15, help="сколько самых дорогих модулей показать")
+    args = parser.parse_args()
+
+    rows, returncode, errors = measure(args.module)
+    if returncode != 0:
+        print(f"Импорт {args.module} завершился с ошибкой, замер неполный:\n{errors}")
+
+    # Накопленное время строки самого модуля на верхнем уровне уже включает всё, что он подтянул;
+    # если её нет (импорт упал раньше), берём сумму строк верхнего уровня
+    own = [r for r in rows if r[3] == 0 and r[0] == args.module]
+    total_ms = (own[0][2] if own else sum(r[2] for r in rows if r[3] == 0)) / 1000
+    print(f"Импорт {args.module}: {total_ms:.0f} мс, модулей: {len(rows)}")
+    print(f"{'накопл., мс':>12} {'собств., мс':>12}  модуль")
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:12.1f} {self_us / 1000:12.1f}  {name}")
+
+    imported = {r[0].split(".")[0] for r in rows}
+    heavy = [m for m in HEAVY_MODULES if m in imported]
+    failed = returncode != 0
+    if heavy:
+        print(f"Тяжёлые модули импортируются при старте: {', '.join(heavy)}")
+        failed = True
+    if args.max_ms and total_ms > args.max_ms:
+        print(f"Превышен порог: {total_ms:.0f} мс > {args.max_ms:.0f} мс")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Локальный OpenAI-совместимый сервер /chat/completions для бенчмарков g4f-клиента.
+
+Отвечает с заданной задержкой и возвращает входные строки в верхнем регистре, в том же
+количестве и порядке, поэтому коррекция и перевод проходят проверку числа строк.
+С --mismatch-rate в части ответов теряется строка, если во входе есть «сбойная» строка
+(содержит "~"), — так проверяется повтор батча половинами.
+Запрос со "stream": true получает ответ Server-Sent Events: первая строка приходит после
+1/5 задержки, остальные равномерно за оставшееся время, как при генерации моделью.
+Отдельно запускается так:
+    python -m benchmarks.mock_chat_server --port 8765 --latency 0.3
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+
+
+def _input_lines(content: str) -> List[str]:
+    """Достаёт строки из промптов g4f_batch_rewrite и g4f_batch_translate"""
+    if "|||" in content or content.startswith("Input lines separated by"):
+        payload = content.split(":\n", 1)[1].rsplit("\nReturn corrected lines", 1)[0]
+        return payload.split("|||")
+    return content.split("newline-separated lines only:\n", 1)[-1].split("\n")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, как у настоящих API
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length).decode("utf-8"))
+        server = self.server
+        with server.stats_lock:
+            server.requests += 1
+        latency = max(0.0, server.latency + random.uniform(-server.jitter, server.jitter))
+        stream = request.get("stream", False)
+        time.sleep(latency / 5 if stream else latency)
+        if random.random() < server.fail_rate:
+            self._reply(503, {"error": "mock failure"})
+            return
+        lines = _input_lines(request["messages"][-1]["content"])
+        if any("~" in line for line in lines) and random.random() < server.mismatch_rate:
+            lines = lines[:-1]
+        answer = [line.strip().upper() for line in lines]
+        if stream:
+            self._stream(answer, latency * 4 / 5)
+            return
+        self._reply(200, {"choices": [{"index": 0, "message": {"role": "assistant", "content": "\n".join(answer)}}]})
+
+    def _stream(self, lines: List[str], duration: float):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, line in enumerate(lines):
+            if i:
+                time.sleep(duration / len(lines))
+            chunk = {"choices": [{"index": 0, "delta": {"content": line + ("\n" if i < len(lines) - 1 else "")}}]}
+            self._chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+        self._chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _reply(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(latency: float = 0.3, jitter: float = 0.05, fail_rate: float = 0.0,
+                 port: int = 0, mismatch_rate: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    """Запускает сервер в фоновом потоке; возвращает (сервер, базовый адрес для g4f_client.configure)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.jitter = jitter
+    server.fail_rate = fail_rate
+    server.mismatch_rate = mismatch_rate
+    server.requests = 0
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3, help="задержка ответа, сек")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument("--mismatch-rate", type=float, default=0.0,
+                        help="доля ответов без последней строки для батчей со строкой, содержащей ~")
+    args = parser.parse_args()
+    server, base = start_server(args.latency, fail_rate=args.fail_rate, port=args.port,
+                                mismatch_rate=args.mismatch_rate)
+    print(f"Сервер запущен: {base} (Ctrl+C — остановить)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Скорость бэкендов перевода (строк в секунду) на одном наборе строк субтитров.
+
+g4f переводит через локальный тестовый сервер, offline — через библиотеку translate и сеть,
+поэтому запускается только с --offline. Запуск из корня репозитория:
+    python -m benchmarks.translation_backends
+    python -m benchmarks.translation_backends --lines 2000 --latency 0.5 --offline --offline-lines 30
+"""
+import argparse
+import time
+
+from app import g4f_client, rate_limiter
+from app.translation_backends import G4FBackend, OfflineBackend, StubBackend, translate_lines
+from benchmarks.mock_chat_server import start_server
+
+
+def measure(backend, lines, target_lang="en"):
+    started = time.perf_counter()
+    result = translate_lines(backend, lines, target_lang, "ru")
+    elapsed = time.perf_counter() - started
+    assert len(result) == len(lines), "порядок/число строк нарушены"
+    return elapsed, sum(text is not None for text in result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=600, help="число строк")
+    parser.add_argument("--latency", type=float, default=0.3, help="задержка ответа тестового сервера, сек")
+    parser.add_argument("--offline", action="store_true", help="замерить и библиотеку translate (нужна сеть)")
+    parser.add_argument("--offline-lines", type=int, default=20, help="строк для offline-замера")
+    parser.add_argument("--offline-rps", type=float, default=10, help="лимит запросов offline-бэкенда в секунду")
+    args = parser.parse_args()
+
+    server, base = start_server(args.latency)
+    g4f_client.configure(api_base=base)
+    lines = [f"Строка субтитров номер {i}." for i in range(args.lines)]
+    backends = [
+        ("stub", StubBackend(), lines),
+        ("stub, 50 мс на батч", StubBackend(latency=0.05), lines),
+        ("g4f, 1 запрос", G4FBackend("mock", concurrency=1), lines),
+        ("g4f", G4FBackend("mock"), lines),
+        ("g4f, батч 100", G4FBackend("mock", batch_size=100), lines),
+    ]
+    if args.offline:
+        rate_limiter.configure("translate", args.offline_rps, 5)
+        backends.append(("offline (translate)", OfflineBackend(), lines[:args.offline_lines]))
+
+    print(f"{len(lines)} строк, задержка сервера {args.latency:.2f} сек")
+    print(f"{'бэкенд':<22} {'батч':>5} {'паралл.':>8} {'время, с':>9} {'строк/с':>9} {'переведено':>11}")
+    for title, backend, part in backends:
+        elapsed, translated = measure(backend, part)
+        print(f"{title:<22} {backend.batch_size:>5} {backend.concurrency:>8} {elapsed:>9.2f} "
+              f"{len(part) / elapsed:>9.0f} {translated / len(part):>10.0%}")
+    print(g4f_client.stats_summary())
+    g4f_client.shutdown()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,11 @@ import os
 from pathlib import Path
 
 from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import QTimer
 
 from ui.main_window import MainWindow
 from ui.splash_screen import SplashScreen
 from app.config import AppConfig
+from app.warmup import WarmupWorker
 from USBKey import USBKey
 
 
@@ -19,14 +19,21 @@ def main():
 
     splash = SplashScreen()
     splash.show()
+    splash.set_status("Загрузка интерфейса...")
+    app.processEvents()
 
+    # Окно показываем сразу, как только построен интерфейс;
+    # заставка остаётся поверх, пока в фоне догружаются torch, whisper и OpenCV
     main_window = MainWindow(config)
-
-    def show_main_window():
-        splash.close()
-        main_window.show()
-
-    QTimer.singleShot(2500, show_main_window)
+    main_window.show()
+
+    warmup = WarmupWorker()
+    warmup.status_changed.connect(splash.set_status)
+    warmup.log_message.connect(main_window.log_message)
+    warmup.warmup_finished.connect(main_window.set_cuda_available)
+    warmup.warmup_finished.connect(lambda _: splash.close())
+    app.aboutToQuit.connect(warmup.wait)
+    warmup.start()
 
     sys.exit(app.exec())
 
@@ -67,7 +67,8 @@ class TranslateAllLanguagesPlugin(PluginBase):
             self.main_window.log_message("info", "Плагин: Перевод отменён пользователем.")
             return
 
-        # Создаём задачи перевода
+        # Создаём задачи перевода: одна задача на видео сразу на все языки —
+        # субтитры разбираются один раз, языки переводятся параллельно
         total_tasks = 0
         for video_file in video_files:
             # Проверяем есть ли уже задача для этого видео
@@ -77,19 +78,24 @@ class TranslateAllLanguagesPlugin(PluginBase):
                 self.main_window.log_message("warning", f"Плагин: Видео {video_file.name} ещё не обработано.")
                 continue
 
-            for lang in languages:
-                if task.language == lang:
-                    continue  # Не переводим на исходный язык
-                translation_task = TranslationTask(
-                    task_id=task.task_id,
-                    source_path=task.result_path,
-                    target_lang=lang,
-                    use_g4f=bool(self.main_window.config.get("use_g4f_translation")),
-                    g4f_model=self.main_window.config.get("g4f_model"),
-                    source_lang=self.main_window.config.get("language")
-                )
-                self.main_window.translator.add_task(translation_task)
-                total_tasks += 1
+            # Не переводим на исходный язык
+            targets = [lang for lang in languages if lang != task.language]
+            if not targets:
+                continue
+            translation_task = TranslationTask(
+                task_id=task.task_id,
+                source_path=task.result_path,
+                target_lang=targets[0],
+                use_g4f=bool(self.main_window.config.get("use_g4f_translation")),
+                g4f_model=self.main_window.config.get("g4f_model"),
+                source_lang=self.main_window.config.get("language"),
+                target_langs=tuple(targets)
+            )
+            widget = self.main_window.task_widgets.get(task.task_id)
+            if widget:
+                widget.set_status_translating()
+            self.main_window.translator.add_task(translation_task)
+            total_tasks += 1
 
         self.main_window.log_message("info", f"Плагин: Создано {total_tasks} задач перевода.")
 
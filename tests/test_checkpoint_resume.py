@@ -0,0 +1,98 @@
+"""Задача, прерванная посреди транскрибации, продолжается с чекпоинта: готовые окна не транскрибируются заново."""
+from pathlib import Path
+
+import numpy as np
+import pytest
+import srt
+
+pytest.importorskip("PyQt6")
+
+from app.audio import SAMPLE_RATE  # noqa: E402
+from app.chunked import plan_windows  # noqa: E402
+from app.models import TranscriptionTask  # noqa: E402
+from app.worker import TranscriptionWorker  # noqa: E402
+
+AUDIO = np.zeros(SAMPLE_RATE * 30, dtype=np.float32)
+WINDOW_SEC = 10
+
+
+class FakeModel:
+    """Вместо Whisper: один сегмент на окно; с fail_on=N падает на N-м вызове, как при убитой задаче"""
+
+    def __init__(self, name: str, fail_on: int = 0):
+        self.name = name
+        self.fail_on = fail_on
+        self.calls = 0
+
+    def transcribe(self, audio, **kwargs):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise RuntimeError("задача прервана")
+        duration = len(audio) / SAMPLE_RATE
+        return {"segments": [{"start": 0.0, "end": duration, "text": f"{self.name}-{self.calls}"}]}
+
+
+def make_worker(tmp_path: Path, model: FakeModel) -> TranscriptionWorker:
+    worker = TranscriptionWorker(checkpoint_dir=tmp_path / "checkpoints")
+    worker._extract_audio = lambda video_path, fingerprint=None: AUDIO
+    worker.model_registry.acquire = lambda size, device: (model, "cpu")
+    worker.model_registry.release = lambda size, device, model, resolved: None
+    return worker
+
+
+def make_task(tmp_path: Path) -> TranscriptionTask:
+    video = tmp_path / "clip.mp4"
+    if not video.exists():
+        video.write_bytes(b"not really a video")
+    return TranscriptionTask(video_path=video, output_dir=tmp_path, output_format="srt", language="ru",
+                             model_size="base", use_g4f_correction=False, checkpoint_window_sec=WINDOW_SEC)
+
+
+def test_killed_job_resumes_from_checkpoint(tmp_path):
+    windows = len(plan_windows(AUDIO, WINDOW_SEC, 0))
+    assert windows >= 3
+
+    first = FakeModel("first", fail_on=2)
+    task = make_task(tmp_path)
+    make_worker(tmp_path, first).process(task)
+    assert task.status == "failed"
+    assert list((tmp_path / "checkpoints").glob("*.jsonl")), "готовое окно должно остаться в чекпоинте"
+    assert not (tmp_path / "clip.srt").exists()
+
+    second = FakeModel("second")
+    task = make_task(tmp_path)
+    make_worker(tmp_path, second).process(task)
+    assert task.status == "completed"
+    # Первое окно взято из чекпоинта, остальные транскрибированы один раз
+    assert second.calls == windows - 1
+
+    subtitles = list(srt.parse((tmp_path / "clip.srt").read_text(encoding="utf-8")))
+    assert [s.content for s in subtitles] == ["first-1"] + [f"second-{i}" for i in range(1, windows)]
+    assert subtitles[0].start.total_seconds() == 0
+    assert subtitles[-1].end.total_seconds() == pytest.approx(len(AUDIO) / SAMPLE_RATE)
+    for a, b in zip(subtitles, subtitles[1:]):
+        assert a.end.total_seconds() == pytest.approx(b.start.total_seconds(), abs=1e-3)
+    # После успешного завершения чекпоинт и частичный SRT удалены
+    assert not list((tmp_path / "checkpoints").glob("*.jsonl"))
+    assert not (tmp_path / "clip.partial.srt").exists()
+
+
+def test_checkpoint_survives_failed_correction(tmp_path, monkeypatch):
+    task = make_task(tmp_path)
+    task.use_g4f_correction = True
+    worker = make_worker(tmp_path, FakeModel("first"))
+
+    def refine(*args):
+        raise RuntimeError("g4f недоступен")
+
+    monkeypatch.setattr(worker, "_g4f_refine_segments", refine)
+    worker.process(task)
+    assert task.status == "failed"
+    # Транскрибация готова целиком и лежит в чекпоинте, повторный запуск не зовёт модель
+    assert list((tmp_path / "checkpoints").glob("*.jsonl"))
+
+    second = FakeModel("second")
+    task = make_task(tmp_path)
+    make_worker(tmp_path, second).process(task)
+    assert task.status == "completed"
+    assert second.calls == 0
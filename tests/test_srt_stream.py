@@ -0,0 +1,41 @@
+"""iter_subtitles разбирает файл так же, как srt.parse целиком.
+
+Текст сравнивается без пустых строк по краям: srt.parse оставляет их в конце субтитра
+в зависимости от числа пустых строк до следующего, а для перевода они не значат ничего.
+"""
+import pytest
+import srt
+
+from app.srt_stream import iter_subtitles
+
+CASES = {
+    "plain": "1\n00:00:01,000 --> 00:00:02,000\nПервый\n\n2\n00:00:02,000 --> 00:00:03,000\nВторой\n",
+    "number_in_text": "1\n00:00:01,000 --> 00:00:02,000\nYear\n\n2024\n\n"
+                      "2\n00:00:03,000 --> 00:00:04,000\nДальше\n",
+    "number_last_in_file": "1\n00:00:01,000 --> 00:00:02,000\nСчёт\n\n42\n",
+    "blank_lines_in_text": "1\n00:00:01,000 --> 00:00:02,000\nстрока\n\n\nещё строка\n\n"
+                           "2\n00:00:03,000 --> 00:00:04,000\nконец\n",
+    "crlf_and_bom": "﻿1\r\n00:00:01,000 --> 00:00:02,000\r\nA\r\n\r\n7\r\n\r\n"
+                    "2\r\n00:00:03,000 --> 00:00:04,000\r\nB\r\n",
+    "extra_gaps": "\n\n1\n00:00:01,000 --> 00:00:02,000\nA\n\n\n\n2\n00:00:03,000 --> 00:00:04,000\nB\n\n\n",
+}
+
+
+def _key(sub: srt.Subtitle):
+    return sub.index, sub.start, sub.end, sub.content.strip()
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_iter_subtitles_matches_srt_parse(tmp_path, name):
+    path = tmp_path / f"{name}.srt"
+    path.write_bytes(CASES[name].encode("utf-8"))
+    expected = list(srt.parse(path.read_text(encoding="utf-8-sig")))
+    assert [_key(sub) for sub in iter_subtitles(path)] == [_key(sub) for sub in expected]
+
+
+def test_iter_subtitles_reports_bytes(tmp_path):
+    path = tmp_path / "plain.srt"
+    path.write_bytes(CASES["plain"].encode("utf-8"))
+    read = []
+    list(iter_subtitles(path, on_bytes=read.append))
+    assert sum(read) == path.stat().st_size
@@ -2,14 +2,20 @@ from pathlib import Path
 import time
 import sys
 
-import cv2
 from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
-import torch
 import importlib.util
 
 from app.models import TranscriptionTask, DeviceType
 from app.worker import TranscriptionWorker
+from app.model_registry import default_slot_count
+from app.result_cache import ResultCache
+from app.audio_cache import AudioCache
+from app.correction_cache import CorrectionCache
+from app.translation_memory import TranslationMemory
+from app.job_store import JobStore, params_to_kwargs
+from app.scheduler import DurationProber, estimate_cost
+from app import g4f_client, rate_limiter
 from app.video_ocr_worker import VideoOCRWorker
 from app.translator import TranslationWorker, TranslationTask
 from app.config import AppConfig
@@ -22,34 +28,84 @@ from ui.SubtitleAreaSelector import SubtitleAreaSelector
 
 
 class MainWindow(QMainWindow):
+    duration_probed = pyqtSignal(str, float)
 
     def __init__(self, config: AppConfig):
         super().__init__()
         self.config = config
         self.tasks = {}
         self.task_widgets = {}
-        self.worker = TranscriptionWorker()
+        # Длительность файлов для планировщика узнаётся в фоне и приходит сигналом в поток интерфейса
+        self.duration_prober = DurationProber()
+        self.duration_probed.connect(self.on_duration_probed)
+        # Узнаём после фонового прогрева torch (см. set_cuda_available)
+        self.cuda_available = False
+        self.result_cache = ResultCache(
+            Path(self.config.get("cache_dir")) / "results",
+            max_mb=float(self.config.get("result_cache_max_mb"))
+        )
+        self.audio_cache = AudioCache(
+            Path(self.config.get("cache_dir")) / "audio",
+            max_mb=float(self.config.get("audio_cache_max_mb"))
+        )
+        self.correction_cache = CorrectionCache(
+            Path(self.config.get("cache_dir")) / "corrections",
+            max_mb=float(self.config.get("correction_cache_max_mb"))
+        )
+        self.translation_memory = TranslationMemory(
+            Path(self.config.get("cache_dir")) / "translation_cache",
+            max_mb=float(self.config.get("translation_memory_max_mb"))
+        )
+        # Очередь в SQLite: задания, прерванные закрытием или падением, возвращаются в очередь.
+        # Воркеры запускаются только после restore_jobs (см. _start_workers), чтобы задания не
+        # забрали раньше, чем появятся их виджеты и применятся слоты и политика из конфига
+        job_store_path = self.config.get("job_store_path")
+        self.job_store = JobStore(Path(job_store_path)) if job_store_path else None
+        self.restored_jobs = []
+        if self.job_store is not None:
+            self.job_store.recover()
+            self.restored_jobs = self.job_store.active_jobs()
+        self.worker = TranscriptionWorker(
+            result_cache=self.result_cache if self.config.get("use_result_cache") else None,
+            checkpoint_dir=Path(self.config.get("cache_dir")) / "checkpoints" if self.config.get("use_checkpoints") else None,
+            audio_cache=self.audio_cache if self.config.get("use_audio_cache") else None,
+            job_store=self.job_store,
+            correction_cache=self.correction_cache if self.config.get("use_correction_cache") else None
+        )
         self.worker.progress_updated.connect(self.on_progress_updated)
+        self.worker.progress_details.connect(self.on_progress_details)
+        self.worker.correction_selected.connect(self.on_correction_selected)
         self.worker.task_completed.connect(self.on_task_completed)
         self.worker.task_failed.connect(self.on_task_failed)
         self.worker.log_message.connect(self.log_message)
-        self.worker.start()
+        # Общий пул клиентов g4f; журнал идёт через сигнал воркера, запросы выполняются не в потоке интерфейса
+        g4f_client.configure(api_base=self.config.get("g4f_api_base"),
+                             timeout=float(self.config.get("g4f_timeout_sec")),
+                             log=self.worker.log_message.emit)
+        rate_limiter.configure_from(self.config)
 
         # OCR воркер
-        self.ocr_worker = VideoOCRWorker()
+        self.ocr_worker = VideoOCRWorker(job_store=self.job_store)
         self.ocr_worker.progress_updated.connect(self.on_progress_updated)
         self.ocr_worker.task_completed.connect(self.on_task_completed)
         self.ocr_worker.task_failed.connect(self.on_task_failed)
         self.ocr_worker.log_message.connect(self.log_message)
-        self.ocr_worker.start()
 
-        self.translator = TranslationWorker()
+        self.translator = TranslationWorker(
+            job_store=self.job_store,
+            memory=self.translation_memory if self.config.get("use_translation_memory") else None,
+            max_languages=int(self.config.get("translate_max_languages")),
+            backend=self.config.get("translation_backend"),
+            g4f_concurrency=int(self.config.get("g4f_max_concurrency")),
+            window_lines=int(self.config.get("translate_window_lines"))
+        )
         self.translator.translation_completed.connect(self.on_translation_completed)
+        self.translator.language_progress.connect(self.on_language_progress)
         self.translator.translation_failed.connect(self.on_translation_failed)
         self.translator.log_message.connect(self.log_message)
-        self.translator.start()
         self.init_ui()
         self.load_settings()
+        self.restore_jobs()
         self.access_level = None
         # --- Проверка USB-ключа ---
 
@@ -124,6 +180,12 @@ class MainWindow(QMainWindow):
         plugins_btn.clicked.connect(self.show_plugin_list_dialog)
         tasks_header_layout.addWidget(plugins_btn)
 
+        # --- Кнопка кэша результатов ---
+        cache_btn = QPushButton("Кэш")
+        cache_btn.setStyleSheet(AppTheme.SECONDARY_BUTTON_STYLE)
+        cache_btn.clicked.connect(self.show_cache_dialog)
+        tasks_header_layout.addWidget(cache_btn)
+
         # --- Кнопка очистки ---
         clear_all_btn = QPushButton("Очистить все")
         clear_all_btn.setStyleSheet(AppTheme.SECONDARY_BUTTON_STYLE)
@@ -213,6 +275,56 @@ class MainWindow(QMainWindow):
         dialog.exec()
         self.plugin_list_widget = None  # Сбрасываем ссылку после закрытия
 
+    def show_cache_dialog(self):
+        """Показывает состояние дисковых кэшей и позволяет их очистить"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Кэш")
+        dialog.setModal(True)
+        dialog.resize(460, 320)
+        dialog.setStyleSheet(AppTheme.GLOBAL_STYLE)
+
+        layout = QVBoxLayout(dialog)
+        caches = [
+            ("Результаты транскрибации", self.result_cache),
+            ("Декодированное аудио", self.audio_cache),
+            ("Коррекция текста g4f", self.correction_cache),
+            ("Память переводов", self.translation_memory),
+        ]
+        for title, cache in caches:
+            row = QHBoxLayout()
+            stats_label = QLabel()
+            row.addWidget(stats_label, 1)
+
+            def refresh_stats(cache=cache, title=title, stats_label=stats_label):
+                count, size = cache.stats()
+                stats_label.setText(
+                    f"{title}\n"
+                    f"Папка: {cache.cache_dir}\n"
+                    f"Записей: {count}, {size / 1024 / 1024:.1f} из {cache.max_bytes / 1024 / 1024:.0f} МБ"
+                )
+
+            def clear_cache(checked=False, cache=cache, title=title, refresh_stats=refresh_stats):
+                cache.clear()
+                self.log_message("info", f"Кэш очищен: {title.lower()}.")
+                refresh_stats()
+
+            refresh_stats()
+            clear_btn = QPushButton("Очистить")
+            clear_btn.setStyleSheet(AppTheme.SECONDARY_BUTTON_STYLE.replace(AppTheme.BORDER, AppTheme.ERROR))
+            clear_btn.clicked.connect(clear_cache)
+            row.addWidget(clear_btn)
+            layout.addLayout(row)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        close_btn = QPushButton("Закрыть")
+        close_btn.setStyleSheet(AppTheme.MAIN_BUTTON_STYLE)
+        close_btn.clicked.connect(dialog.accept)
+        button_layout.addWidget(close_btn)
+        layout.addLayout(button_layout)
+
+        dialog.exec()
+
     def update_plugin_list(self):
         """Обновляет список плагинов в виджете"""
         if self.plugin_list_widget:
@@ -253,7 +365,13 @@ class MainWindow(QMainWindow):
             self.lang_combo.setEnabled(True)
             self.model_combo.setEnabled(True)
             self.cpu_radio.setEnabled(True)
-            self.gpu_radio.setEnabled(torch.cuda.is_available())
+            self.gpu_radio.setEnabled(self.cuda_available)
+
+    def set_cuda_available(self, available: bool):
+        """Вызывается по окончании фонового прогрева библиотек"""
+        self.cuda_available = available
+        # Выбор устройства может быть запрещён уровнем доступа или режимом OCR
+        self.gpu_radio.setEnabled(available and self.cpu_radio.isEnabled())
 
     def auto_detect_subtitle_region(self):
         """Автоматическое определение области субтитров"""
@@ -372,7 +490,7 @@ class MainWindow(QMainWindow):
         self.cpu_radio.setStyleSheet(AppTheme.RADIOBUTTON_STYLE)
         self.gpu_radio = QRadioButton("GPU (CUDA)")
         self.gpu_radio.setStyleSheet(AppTheme.RADIOBUTTON_STYLE)
-        self.gpu_radio.setEnabled(torch.cuda.is_available())
+        self.gpu_radio.setEnabled(self.cuda_available)
         self.device_group.addButton(self.cpu_radio)
         self.device_group.addButton(self.gpu_radio)
         device_layout.addWidget(self.cpu_radio)
@@ -618,6 +736,7 @@ class MainWindow(QMainWindow):
             self.output_label.setText(directory)
 
     def add_video_files(self, file_paths: list[Path]):
+        added = []
         for path in file_paths:
             if any(path.name == task.video_path.name for task in self.tasks.values()):
                 self.log_message("warning", f"Файл '{path.name}' уже находится в очереди.")
@@ -625,11 +744,76 @@ class MainWindow(QMainWindow):
             task = TranscriptionTask(video_path=path, output_dir=Path(), output_format="", language="", model_size="")
             self.tasks[task.task_id] = task
             self.add_task_widget(task)
+            self.duration_prober.submit(task.task_id, path, self.duration_probed.emit)
+            added.append(task)
+        if self.job_store is not None and added:
+            self.job_store.save_many(TranscriptionWorker.job_kind, added)
+
+    # Сколько восстановленных заданий получают виджеты за один проход цикла событий
+    RESTORE_PAGE_SIZE = 50
+
+    def restore_jobs(self):
+        """Показывает задания, не завершённые в прошлый запуск, и затем запускает воркеры.
+
+        Задачи регистрируются сразу, а виджеты создаются страницами по RESTORE_PAGE_SIZE
+        в следующих проходах цикла событий, чтобы окно с тысячами заданий открывалось без задержки.
+        Воркеры стартуют после последней страницы, так что сигналы прогресса не теряются.
+        """
+        restored = []
+        for kind, state, params in self.restored_jobs:
+            if kind == TranslationWorker.job_kind:
+                continue
+            task = TranscriptionTask(**params_to_kwargs(params))
+            task.status = state
+            self.tasks[task.task_id] = task
+            if task.duration_sec is None:
+                self.duration_prober.submit(task.task_id, task.video_path, self.duration_probed.emit)
+            restored.append(task.task_id)
+        self.restored_jobs = []
+        if restored:
+            self.log_message("info", f"Восстановлено заданий из прошлого запуска: {len(restored)}")
+        self._add_restored_widgets(restored)
+        if any(task.status in ("queued", "running") for task in self.tasks.values()):
+            self.process_btn.setEnabled(False)
+            self.stop_btn.setEnabled(True)
+
+    def _add_restored_widgets(self, task_ids):
+        page, rest = task_ids[:self.RESTORE_PAGE_SIZE], task_ids[self.RESTORE_PAGE_SIZE:]
+        for task_id in page:
+            # Задачу могли удалить до того, как до неё дошла очередь
+            if task_id in self.tasks and task_id not in self.task_widgets:
+                self.add_task_widget(self.tasks[task_id])
+        if rest:
+            QTimer.singleShot(0, lambda: self._add_restored_widgets(rest))
+        else:
+            self._start_workers()
+
+    def _apply_worker_settings(self):
+        """Политика очереди, число слотов и бюджет моделей из конфига"""
+        policy = self.config.get("scheduler_policy")
+        self.worker.set_policy(policy)
+        self.ocr_worker.set_policy(policy)
+        slots = int(self.config.get("max_concurrent_tasks") or 0)
+        if slots <= 0:
+            slots = default_slot_count(self.config.get("model_size"), self.config.get("device"))
+        self.worker.set_max_slots(slots)
+        self.worker.model_registry.configure(
+            budget_gb=float(self.config.get("model_cache_budget_gb") or 0),
+            idle_timeout=float(self.config.get("model_idle_timeout_sec"))
+        )
+        return slots
+
+    def _start_workers(self):
+        self._apply_worker_settings()
+        self.worker.start()
+        self.ocr_worker.start()
+        self.translator.start()
 
     def add_task_widget(self, task):
         widget = VideoTaskWidget(task)
         widget.remove_requested.connect(self.remove_task)
         widget.translate_requested.connect(self.handle_translation_request)
+        widget.priority_requested.connect(self.bump_priority)
         self.task_widgets[task.task_id] = widget
         count = self.tasks_layout.count()
         self.tasks_layout.insertWidget(count - 1, widget)
@@ -640,6 +824,29 @@ class MainWindow(QMainWindow):
             del self.task_widgets[task_id]
         if task_id in self.tasks:
             del self.tasks[task_id]
+        if self.job_store is not None:
+            self.job_store.remove(task_id)
+
+    def on_duration_probed(self, task_id: str, duration: float):
+        task = self.tasks.get(task_id)
+        if task is None or duration < 0:
+            return
+        task.duration_sec = duration
+        task.cost = estimate_cost(task)
+        if self.job_store is not None:
+            self.job_store.set_duration(task_id, duration, task.cost)
+        if task_id in self.task_widgets:
+            self.task_widgets[task_id].update_schedule_info()
+
+    def bump_priority(self, task_id: str):
+        task = self.tasks.get(task_id)
+        if task is None or task.status not in ("pending", "queued"):
+            return
+        task.priority += 1
+        self.worker.set_priority(task_id, task.priority)
+        self.ocr_worker.set_priority(task_id, task.priority)
+        if task_id in self.task_widgets:
+            self.task_widgets[task_id].update_schedule_info()
 
     def clear_all_tasks(self):
         for task_id in list(self.tasks.keys()):
@@ -654,12 +861,15 @@ class MainWindow(QMainWindow):
         self.stop_btn.setEnabled(True)
         # Определяем какой воркер использовать
         use_ocr_mode = self.config.get("use_ocr_mode") or False
-        
+        slots = self._apply_worker_settings()
+
         if use_ocr_mode:
             self.ocr_worker.resume_processing()
         else:
+            self.log_message("info", f"Одновременных задач транскрибации: {slots}")
             self.worker.resume_processing()
             
+        ocr_tasks, audio_tasks = [], []
         for task_id, task in self.tasks.items():
             if task.status == "pending":
                 task.output_dir = Path(self.config.get("output_dir"))
@@ -667,6 +877,14 @@ class MainWindow(QMainWindow):
                 task.device = self.config.get("device")
                 task.use_g4f_correction = bool(self.config.get("use_g4f_correction"))
                 task.g4f_model = self.config.get("g4f_model")
+                task.g4f_max_concurrency = int(self.config.get("g4f_max_concurrency"))
+                task.g4f_batch_tokens = int(self.config.get("g4f_batch_tokens"))
+                task.g4f_stream = bool(self.config.get("g4f_stream"))
+                task.g4f_correction_mode = self.config.get("g4f_correction_mode")
+                task.g4f_min_avg_logprob = float(self.config.get("g4f_min_avg_logprob"))
+                task.g4f_max_compression_ratio = float(self.config.get("g4f_max_compression_ratio"))
+                task.g4f_no_speech_threshold = float(self.config.get("g4f_no_speech_threshold"))
+                task.g4f_context_lines = int(self.config.get("g4f_context_lines"))
                 
                 if use_ocr_mode:
                     # OCR режим
@@ -675,13 +893,21 @@ class MainWindow(QMainWindow):
                     task.ocr_language = self.config.get("ocr_language") or "eng"
                     task.subtitle_region = self.config.get("subtitle_region")
                     task.status = "queued"
-                    self.ocr_worker.add_task(task)
+                    ocr_tasks.append(task)
                 else:
                     # Аудио режим
                     task.language = self.config.get("language")
                     task.model_size = self.config.get("model_size")
+                    task.use_vad = bool(self.config.get("use_vad"))
+                    task.use_parallel_chunks = bool(self.config.get("use_parallel_chunks"))
+                    task.chunk_window_sec = float(self.config.get("chunk_window_sec"))
+                    task.chunk_overlap_sec = float(self.config.get("chunk_overlap_sec"))
+                    task.chunk_processes = int(self.config.get("chunk_processes"))
+                    task.checkpoint_window_sec = float(self.config.get("checkpoint_window_sec"))
                     task.status = "queued"
-                    self.worker.add_task(task)
+                    audio_tasks.append(task)
+        self.ocr_worker.add_tasks(ocr_tasks)
+        self.worker.add_tasks(audio_tasks)
         self.log_message("info", f"Запущена обработка {len(self.tasks)} задач.")
 
     def stop_processing(self):
@@ -698,6 +924,14 @@ class MainWindow(QMainWindow):
         if task_id in self.task_widgets:
             self.task_widgets[task_id].update_progress(progress)
 
+    def on_progress_details(self, task_id, eta, speed):
+        if task_id in self.task_widgets:
+            self.task_widgets[task_id].update_details(eta, speed)
+
+    def on_correction_selected(self, task_id, sent, total):
+        if task_id in self.task_widgets:
+            self.task_widgets[task_id].set_correction_share(sent, total)
+
     def on_task_completed(self, task_id, output_path):
         if task_id in self.tasks:
             self.tasks[task_id].status = "completed"
@@ -754,6 +988,11 @@ class MainWindow(QMainWindow):
         if widget:
             widget.set_status_translation_complete()
 
+    def on_language_progress(self, task_id: str, lang: str, value: int):
+        widget = self.task_widgets.get(task_id)
+        if widget:
+            widget.set_language_progress(lang, value)
+
     def on_translation_failed(self, task_id: str, error: str):
         widget = self.task_widgets.get(task_id)
         if widget:
@@ -782,12 +1021,14 @@ class MainWindow(QMainWindow):
         self.save_settings()
         # Выгружаем все плагины при закрытии
         self.plugin_manager.unload_all_plugins()
+        self.duration_prober.shutdown()
         self.worker.stop()
         self.ocr_worker.stop()
         self.translator.stop()
         self.worker.wait()
         self.ocr_worker.wait()
         self.translator.wait()
+        g4f_client.shutdown()
         event.accept()
 
     def select_subtitle_area_handler(self):
@@ -3,16 +3,21 @@ from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 
 from app.models import TranscriptionTask
+from app.progress import format_eta
 from .styles import AppTheme
 
 
 class VideoTaskWidget(QFrame):
     remove_requested = pyqtSignal(str)
     translate_requested = pyqtSignal(str)
+    priority_requested = pyqtSignal(str)
 
     def __init__(self, task: TranscriptionTask):
         super().__init__()
         self.task = task
+        self.details_text = ""
+        self.correction_text = ""
+        self.language_progress = {}
         self.init_ui()
 
     def init_ui(self):
@@ -43,6 +48,11 @@ class VideoTaskWidget(QFrame):
         self.status_label.setStyleSheet(f"color: {AppTheme.TEXT_SECONDARY}; background: transparent; border: none;")
         info_layout.addWidget(self.status_label)
 
+        self.schedule_label = QLabel("")
+        self.schedule_label.setStyleSheet(f"color: {AppTheme.TEXT_SECONDARY}; background: transparent; border: none;")
+        info_layout.addWidget(self.schedule_label)
+        self.update_schedule_info()
+
         self.progress_bar = QProgressBar()
         self.progress_bar.setMaximum(100)
         self.progress_bar.setValue(0)
@@ -90,8 +100,28 @@ class VideoTaskWidget(QFrame):
         """)
         self.remove_btn.clicked.connect(lambda: self.remove_requested.emit(self.task.task_id))
 
+        self.priority_btn = QPushButton("▲")
+        self.priority_btn.setFixedSize(32, 32)
+        self.priority_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.priority_btn.setToolTip("Повысить приоритет")
+        self.priority_btn.setStyleSheet(f"""
+            QPushButton {{
+                background-color: transparent;
+                color: {AppTheme.TEXT_SECONDARY};
+                border: none;
+                font-size: 14px;
+                border-radius: 16px;
+            }}
+            QPushButton:hover {{
+                background-color: {AppTheme.BORDER};
+                color: {AppTheme.ACCENT};
+            }}
+        """)
+        self.priority_btn.clicked.connect(lambda: self.priority_requested.emit(self.task.task_id))
+
         top_right_layout = QHBoxLayout()
         top_right_layout.addStretch()
+        top_right_layout.addWidget(self.priority_btn)
         top_right_layout.addWidget(self.remove_btn)
 
         actions_wrapper_layout = QVBoxLayout()
@@ -108,16 +138,50 @@ class VideoTaskWidget(QFrame):
     def update_progress(self, value: int):
         self.progress_bar.setValue(value)
         if value < 100:
-            self.status_label.setText(f"В работе... {value}%")
+            self.status_label.setText(f"В работе... {value}%{self.details_text}")
             self.status_label.setStyleSheet(f"color: {AppTheme.WARNING}; background: transparent; border: none;")
         else:
             self.status_label.setText("Завершено")
             self.status_label.setStyleSheet(f"color: {AppTheme.SUCCESS}; background: transparent; border: none;")
 
+    def update_details(self, eta: float, speed: float):
+        parts = []
+        if eta >= 0:
+            parts.append(f"осталось {format_eta(eta)}")
+        if speed > 0:
+            parts.append(f"{speed:.1f}x")
+        self.details_text = "".join(f" · {part}" for part in parts)
+        self.update_progress(self.progress_bar.value())
+
+    def update_schedule_info(self):
+        """Длительность файла и приоритет задачи под названием"""
+        parts = []
+        if self.task.duration_sec is not None:
+            parts.append(format_eta(self.task.duration_sec))
+        if self.task.priority:
+            parts.append(f"приоритет {self.task.priority}")
+        if self.correction_text:
+            parts.append(self.correction_text)
+        self.schedule_label.setText(" · ".join(parts))
+        self.schedule_label.setVisible(bool(parts))
+
+    def set_correction_share(self, sent: int, total: int):
+        share = sent / total if total else 0.0
+        self.correction_text = f"g4f: {sent} из {total} сегментов ({share:.0%})"
+        self.update_schedule_info()
+
     def show_translation_controls(self):
         self.translate_btn.show()
 
+    def set_language_progress(self, lang: str, value: int):
+        """Прогресс перевода на несколько языков: по проценту на язык в строке статуса"""
+        self.language_progress[lang] = value
+        parts = " · ".join(f"{code} {pct}%" for code, pct in self.language_progress.items())
+        self.status_label.setText(f"Перевод: {parts}")
+        self.status_label.setStyleSheet(f"color: {AppTheme.WARNING}; background: transparent; border: none;")
+
     def set_status_translating(self):
+        self.language_progress = {}
         self.status_label.setText("Перевод...")
         self.status_label.setStyleSheet(f"color: {AppTheme.WARNING}; background: transparent; border: none;")
         self.translate_btn.setEnabled(False)